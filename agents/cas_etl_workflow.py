@@ -1,84 +1,105 @@
-import json
+import asyncio
 
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
 from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.graph import StateGraph
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
 
-from domain.cas_parser import CasParser
+from config.constants import SUMMARY_COMMENTARY
+from domain.portfolio_summary import render_portfolio_summary
+from services.portfolio_store import get_portfolio_store
+from services.tool_cache import get_tool_cache
+from services.upload_jobs import parse_cas_to_store
 from types_ import CASAgentState
-from utils.db_utils import get_sqlite_connection
+from utils.checkpointer import MessageStoreSqliteSaver
+from utils.db_utils import get_thread_local_sqlite
 
-PORTFOLIO_SUMMARY_PROMPT = """
-    You are a portfolio summarizer.
-
-    ## Inputs
-
-    You will be given two tables:
+COMMENTARY_PROMPT = """
+    You are a portfolio summarizer. You will be given a markdown summary of a user's mutual
+    fund holdings with gains already computed. Write a short commentary (at most 3 sentences)
+    on what stands out. Do not repeat the tables and do not recompute any numbers.
+"""
 
-    ### 1. Current Holdings
-    - Each row contains: scheme name, ISIN, units held, invested amount, and current market value.
-    - Your task: For each scheme, calculate:
-    - Absolute gain = market value − amount
-    - Percentage gain = (gain / amount) × 100
-    - Output: A markdown table with scheme name, amount, market value, absolute gain, and percentage gain.
 
-    ### 2. Past Holdings
-    - This table contains schemes the user had invested in previously but currently holds zero units.
-    - Your task: List only the scheme names in a simple markdown table.
+llm_with_tools = ChatOpenAI(temperature=0, model="gpt-4o")
 
-    ## Guidelines
 
-    - Return both tables in markdown format.
-    - At the top, include a brief description of what "current holdings" and "past holdings" represent.
-"""
+def _render_summary(state: CASAgentState) -> str:
+    store = get_portfolio_store()
+    return render_portfolio_summary(
+        store.read(state["portfolio"], "curr_holdings"),
+        store.read(state["portfolio"], "past_holdings"),
+    )
 
 
-llm_with_tools = ChatOpenAI(temperature=0, model="gpt-4o")
+def _commentary_messages(summary: str):
+    return [SystemMessage(COMMENTARY_PROMPT), HumanMessage(summary)]
 
 
 def portfolio_summary_node(state: CASAgentState):
-    holdings = {
-        "curr_holdings": state["curr_holdings"],
-        "past_holdings": state["past_holdings"],
-    }
+    summary = _render_summary(state)
+    if SUMMARY_COMMENTARY:
+        commentary = llm_with_tools.invoke(_commentary_messages(summary))
+        summary = f"{summary}\n\n{commentary.content}"
+    return {"messages": [AIMessage(summary)]}
 
-    holdings_as_json_str = f"```json\n{json.dumps(holdings, indent=2)}\n```"
 
-    messages = [
-        SystemMessage(PORTFOLIO_SUMMARY_PROMPT),
-        HumanMessage(f"Here are my holdings:\n{holdings_as_json_str}"),
-    ]
-    return {"messages": [llm_with_tools.invoke(messages)]}
+async def aportfolio_summary_node(state: CASAgentState):
+    summary = await asyncio.to_thread(_render_summary, state)
+    if SUMMARY_COMMENTARY:
+        commentary = await llm_with_tools.ainvoke(_commentary_messages(summary))
+        summary = f"{summary}\n\n{commentary.content}"
+    return {"messages": [AIMessage(summary)]}
 
 
 class CasETLWorkflow:
-    def __init__(self):
+    def __init__(self, checkpointer=None):
         graph_builder = StateGraph(CASAgentState)
         # graph_builder.add_node("cas_parser_node", cas_parser_node)
-        graph_builder.add_node("portfolio_summary_node", portfolio_summary_node)
+        graph_builder.add_node(
+            "portfolio_summary_node",
+            RunnableLambda(portfolio_summary_node, afunc=aportfolio_summary_node),
+        )
 
         graph_builder.set_entry_point("portfolio_summary_node")
         # graph_builder.add_edge("cas_parser_node", "portfolio_summary_node")
         graph_builder.set_finish_point("portfolio_summary_node")
 
-        with get_sqlite_connection() as conn:
-            memory = SqliteSaver(conn)
-            self.agent = graph_builder.compile(checkpointer=memory)
+        if checkpointer is None:
+            checkpointer = MessageStoreSqliteSaver(get_thread_local_sqlite())
+        self.agent = graph_builder.compile(checkpointer=checkpointer)
 
-    def _parse_cas(self, cas_file_stream, password):
-        cas_parser = CasParser(cas_file_stream, password)
-        transactions, curr_holdings, past_holdings = cas_parser.parse()
-        return {
-            "transactions": transactions,
-            "curr_holdings": curr_holdings,
-            "past_holdings": past_holdings,
-        }
+    def _parse_cas(self, session_id, cas_file_stream, password):
+        handle = parse_cas_to_store(session_id, cas_file_stream.read(), password)
+        return {"portfolio": handle}
 
     def invoke(self, session_id, cas_file_stream, password):
-        pf_details = self._parse_cas(cas_file_stream, password)
+        pf_details = self._parse_cas(session_id, cas_file_stream, password)
         config = {"configurable": {"thread_id": session_id}}
         self.agent.update_state(config, pf_details)
+        # only now that the state points at the new version are older ones unused
+        get_portfolio_store().prune(pf_details["portfolio"])
+        get_tool_cache().invalidate(session_id)
         result = self.agent.invoke({}, config=config)
-        self.agent.update_state(config, {"messages": []})
+        self.agent.update_state(config, {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES)]})
+        return result["messages"][-1].content
+
+    async def ainvoke(self, session_id, cas_file_stream, password):
+        # PDF decryption and parsing are CPU-bound; run them outside the event loop
+        pf_details = await asyncio.to_thread(
+            self._parse_cas, session_id, cas_file_stream, password
+        )
+        return await self.asummarize(session_id, pf_details)
+
+    async def asummarize(self, session_id, pf_details):
+        config = {"configurable": {"thread_id": session_id}}
+        await self.agent.aupdate_state(config, pf_details)
+        # only now that the state points at the new version are older ones unused
+        await asyncio.to_thread(get_portfolio_store().prune, pf_details["portfolio"])
+        get_tool_cache().invalidate(session_id)
+        result = await self.agent.ainvoke({}, config=config)
+        await self.agent.aupdate_state(
+            config, {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES)]}
+        )
         return result["messages"][-1].content
@@ -1,18 +1,34 @@
-import json
+import asyncio
+import logging
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
 from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.graph import StateGraph
 from langgraph.prebuilt import tools_condition
 
+from config.constants import (
+    HOLDINGS_CONTEXT_TOKEN_BUDGET,
+    TOOL_CALL_TIMEOUT_SECONDS,
+    TOOL_RESULT_TOKEN_BUDGET,
+)
+from services.portfolio_store import get_portfolio_store
+from services.tool_cache import get_tool_cache
+from tools.data_refs import bind_session_data, data_args
 from tools.schema import tools
 from types_ import CASAgentState
-from utils.db_utils import get_sqlite_connection
-from utils.generic_utils import object_to_json_str
+from utils.checkpointer import MessageStoreSqliteSaver
+from utils.context_encoder import count_message_tokens, encode_table, encode_value
+from utils.db_utils import get_thread_local_sqlite
+from utils.session_ids import PortfolioNotUploadedError
+
+logger = logging.getLogger(__name__)
 
 PORTFOLIO_QUERY_PROMPT = """
 You are an intelligent assistant that answers user questions about their investment portfolio
@@ -52,86 +68,253 @@ llm_with_tools = ChatOpenAI(
 ).bind_tools(tools, tool_choice="auto", strict=False)
 
 
+def _filter_tool_messages(messages):
+    return [
+        msg
+        for msg in messages
+        if (
+            isinstance(msg, (HumanMessage | AIMessage | SystemMessage))
+            and not getattr(msg, "tool_calls", None)  # removes assistant tool calls
+        )
+    ]
+
+
+def _prompt_messages(messages):
+    # Tool calls and results of earlier turns stay in the checkpointed history but are
+    # not sent back to the LLM; the current turn (from the last user query) is kept whole.
+    last_query_idx = max(
+        (idx for idx, msg in enumerate(messages) if isinstance(msg, HumanMessage)), default=0
+    )
+    return _filter_tool_messages(messages[:last_query_idx]) + messages[last_query_idx:]
+
+
+def _log_prompt_size(messages):
+    logger.info(
+        "LLM prompt: %d messages, %d tokens", len(messages), count_message_tokens(messages)
+    )
+
+
 def llm_node(state: CASAgentState):
-    resp = llm_with_tools.invoke(state["messages"])
-    return {"messages": state["messages"] + [resp]}
+    messages = _prompt_messages(state["messages"])
+    _log_prompt_size(messages)
+    resp = llm_with_tools.invoke(messages)
+    return {"messages": [resp]}
+
+
+async def allm_node(state: CASAgentState):
+    messages = _prompt_messages(state["messages"])
+    _log_prompt_size(messages)
+    resp = await llm_with_tools.ainvoke(messages)
+    return {"messages": [resp]}
 
 
 tools_by_name = {tool.name: tool for tool in tools}
+# arguments each tool takes as `var_*` references to the session's stored datasets
+tool_data_args = {tool.name: data_args(tool) for tool in tools}
+# tools that take the session's portfolio handle as an injected (hidden from the LLM) arg
+portfolio_tools = {
+    tool.name
+    for tool in tools
+    if "portfolio" in tool.args and "portfolio" not in tool.tool_call_schema.model_fields
+}
+
+
+def _invoke_tool(tool_call, portfolio, cache_key):
+    name = tool_call["name"]
+    # a copy, so the bound data is not written back into the checkpointed AIMessage; bound
+    # here so an unknown tool or a bad `var_*` reference only fails its own call
+    args = bind_session_data(tool_data_args[name], tool_call["args"], portfolio)
+    if name in portfolio_tools:
+        args["portfolio"] = portfolio
+    observation = tools_by_name[name].invoke(args)
+    get_tool_cache().put(cache_key, observation)
+    return observation
+
+
+def _cached_observation(observation):
+    return observation
+
+
+def _resolve_tool_calls(state: dict):
+    """Pair each tool call with a no-argument callable producing its observation."""
+    tool_cache = get_tool_cache()
+    calls = []
+    for tool_call in state["messages"][-1].tool_calls:
+        # keyed on the unresolved `var_*` references plus the portfolio version
+        cache_key = tool_cache.key(state["portfolio"], tool_call["name"], tool_call["args"])
+        hit, observation = tool_cache.get(cache_key)
+        if hit:
+            calls.append((tool_call, partial(_cached_observation, observation)))
+            continue
+        calls.append((tool_call, partial(_invoke_tool, tool_call, state["portfolio"], cache_key)))
+    return calls
+
+
+def _tool_pool(calls) -> ThreadPoolExecutor:
+    # a pool per step with a thread per call: every call starts when submitted, so its
+    # timeout only covers its own run, and a hung tool (which keeps its thread until it
+    # returns) never delays the calls of later steps or other sessions
+    return ThreadPoolExecutor(max_workers=max(len(calls), 1), thread_name_prefix="tool")
+
+
+def _tool_message(tool_call, observation):
+    return ToolMessage(
+        content=encode_value(observation, TOOL_RESULT_TOKEN_BUDGET),
+        name=tool_call["name"],
+        tool_call_id=tool_call["id"],
+    )
+
+
+def _error_message(tool_call, exc: Exception):
+    # the LLM sees the error in place of the result and can retry with other arguments
+    if isinstance(exc, TimeoutError):
+        content = f"{tool_call['name']} timed out after {TOOL_CALL_TIMEOUT_SECONDS}s"
+    else:
+        logger.warning("Tool call %s failed", tool_call["name"], exc_info=exc)
+        content = str(exc) or type(exc).__name__
+    return ToolMessage(
+        content=content,
+        name=tool_call["name"],
+        tool_call_id=tool_call["id"],
+        status="error",
+    )
 
 
 def tool_node(state: dict):
-    def _parse_tool_call(tool_call):
-        tool = tools_by_name[tool_call["name"]]
-        args = tool_call["args"]
-        if args.get("transactions") == "var_transactions":
-            args["transactions"] = state.get("transactions")
-        if args.get("curr_holdings") == "var_curr_holdings":
-            args["curr_holdings"] = state.get("curr_holdings")
-        return tool, args
+    calls = _resolve_tool_calls(state)
+    executor = _tool_pool(calls)
+    futures = [executor.submit(run) for _, run in calls]
 
+    # all calls start on submission, so one deadline from then bounds each of them
+    deadline = time.monotonic() + TOOL_CALL_TIMEOUT_SECONDS
     result = []
-    for tool_call in state["messages"][-1].tool_calls:
-        tool, args = _parse_tool_call(tool_call)
-        observation = tool.invoke(args)
+    try:
+        for (tool_call, _), future in zip(calls, futures):
+            try:
+                observation = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except Exception as e:
+                result.append(_error_message(tool_call, e))
+                continue
+            result.append(_tool_message(tool_call, observation))
+    finally:
+        executor.shutdown(wait=False)
+    return {"messages": result}
 
-        result.append(
-            ToolMessage(content=object_to_json_str(observation), tool_call_id=tool_call["id"])
-        )
-    return {"messages": state["messages"] + result}
+
+async def atool_node(state: dict):
+    # tools are CPU-bound pandas/NumPy code; keep them off the event loop
+    calls = await asyncio.to_thread(_resolve_tool_calls, state)
+    loop = asyncio.get_running_loop()
+    executor = _tool_pool(calls)
+
+    async def _run(tool_call, run):
+        try:
+            observation = await asyncio.wait_for(
+                loop.run_in_executor(executor, run), TOOL_CALL_TIMEOUT_SECONDS
+            )
+        except Exception as e:
+            return _error_message(tool_call, e)
+        return _tool_message(tool_call, observation)
+
+    try:
+        # gather keeps the tool call order, so ToolMessages line up with the AIMessage
+        return {"messages": list(await asyncio.gather(*(_run(*call) for call in calls)))}
+    finally:
+        executor.shutdown(wait=False)
 
 
 class PFAnalyzerAgent:
-    def __init__(self):
+    def __init__(self, checkpointer=None):
         graph_builder = StateGraph(CASAgentState)
-        graph_builder.add_node("llm_node", llm_node)
-        graph_builder.add_node("tools", tool_node)
+        graph_builder.add_node("llm_node", RunnableLambda(llm_node, afunc=allm_node))
+        graph_builder.add_node("tools", RunnableLambda(tool_node, afunc=atool_node))
 
         graph_builder.set_entry_point("llm_node")
         graph_builder.add_conditional_edges("llm_node", tools_condition)
         graph_builder.add_edge("tools", "llm_node")
         graph_builder.set_finish_point("llm_node")
 
-        with get_sqlite_connection() as conn:
-            memory = SqliteSaver(conn)
-            self.agent = graph_builder.compile(checkpointer=memory)
+        if checkpointer is None:
+            checkpointer = MessageStoreSqliteSaver(get_thread_local_sqlite())
+        self.agent = graph_builder.compile(checkpointer=checkpointer)
 
     def _get_system_prompt(self, state: CASAgentState):
-        holdings = {
-            "curr_holdings": state["curr_holdings"],
-            "past_holdings": state["past_holdings"],
-        }
-
-        holdings_as_json_str = f"```json\n{json.dumps(holdings, indent=2)}\n```"
+        store = get_portfolio_store()
+        # largest positions first so they survive truncation to the token budget
+        curr_holdings = store.read(state["portfolio"], "curr_holdings").sort_values(
+            "market_value", ascending=False
+        )
+        past_holdings = store.read(state["portfolio"], "past_holdings")
 
         return [
             SystemMessage(PORTFOLIO_QUERY_PROMPT),
-            HumanMessage(f"Here are my holdings:\n{holdings_as_json_str}"),
+            HumanMessage(
+                "Here are my holdings:\n"
+                f"curr_holdings:\n{encode_table(curr_holdings, HOLDINGS_CONTEXT_TOKEN_BUDGET)}\n"
+                f"past_holdings:\n{encode_table(past_holdings, HOLDINGS_CONTEXT_TOKEN_BUDGET // 4)}"
+            ),
         ]
 
-    def _filter_tool_messages(self, messages):
-        return [
-            msg
-            for msg in messages
-            if (
-                isinstance(msg, (HumanMessage | AIMessage | SystemMessage))
-                and not getattr(msg, "tool_calls", None)  # removes assistant tool calls
-            )
-        ]
-        # return [msg for msg in messages if msg.type not in {"tool", "tool_use", "tool_result"}]
+    @staticmethod
+    def _require_portfolio(session_id, state):
+        if not state.get("portfolio"):
+            raise PortfolioNotUploadedError(session_id)
 
     def invoke(self, session_id, query):
         config = {"configurable": {"thread_id": session_id}}
         state = self.agent.get_state(config).values
-        if not (messages := state["messages"]):
-            messages = self._get_system_prompt(state)
-        else:
-            messages = self._filter_tool_messages(messages)
+        self._require_portfolio(session_id, state)
+        # only the new messages are sent; the add_messages reducer appends them to the history
+        messages = [] if state.get("messages") else self._get_system_prompt(state)
         messages.append(HumanMessage(query))
         result = self.agent.invoke({"messages": messages}, config=config)
-        print(result["messages"][-1])
         return result["messages"][-1].content
 
+    async def _anew_messages(self, config, query):
+        state = (await self.agent.aget_state(config)).values
+        self._require_portfolio(config["configurable"]["thread_id"], state)
+        if state.get("messages"):
+            messages = []
+        else:
+            messages = await asyncio.to_thread(self._get_system_prompt, state)
+        messages.append(HumanMessage(query))
+        return messages
+
+    async def ainvoke(self, session_id, query):
+        config = {"configurable": {"thread_id": session_id}}
+        messages = await self._anew_messages(config, query)
+        result = await self.agent.ainvoke({"messages": messages}, config=config)
+        return result["messages"][-1].content
+
+    async def astream(self, session_id, query):
+        """
+        Run one chat turn, yielding `(event, data)` pairs as the graph progresses.
+
+        Events are `token` (a piece of the answer text), `tool_start` / `tool_end` (tool
+        name per call) and finally `done` with the full reply.
+        """
+        config = {"configurable": {"thread_id": session_id}}
+        messages = await self._anew_messages(config, query)
+        reply = ""
+        async for mode, chunk in self.agent.astream(
+            {"messages": messages}, config=config, stream_mode=["messages", "updates"]
+        ):
+            if mode == "messages":
+                message, metadata = chunk
+                # tool-call argument chunks carry no text
+                if metadata.get("langgraph_node") == "llm_node" and message.content:
+                    yield "token", message.content
+            elif "llm_node" in chunk:
+                message = chunk["llm_node"]["messages"][-1]
+                for tool_call in message.tool_calls:
+                    yield "tool_start", tool_call["name"]
+                if not message.tool_calls:
+                    reply = message.content
+            elif "tools" in chunk:
+                for message in chunk["tools"]["messages"]:
+                    yield "tool_end", message.name
+        yield "done", reply
+
 
 if __name__ == "__main__":
     graph = PFAnalyzerAgent()
@@ -1,4 +1,5 @@
 import sqlite3
+from functools import cache
 from typing import Annotated, TypedDict
 
 from langchain_core.messages import AnyMessage, HumanMessage
@@ -55,9 +56,12 @@ graph_builder.add_conditional_edges("llm_node", tools_condition)
 graph_builder.add_edge("tools", "llm_node")
 graph_builder.set_finish_point("llm_node")
 
-conn = sqlite3.connect("./data/checkpoints.sqlite", check_same_thread=False)
-memory = SqliteSaver(conn)
-agent = graph_builder.compile(checkpointer=memory)
+
+@cache
+def get_agent():
+    # opened on first use, not when the module is imported
+    conn = sqlite3.connect("./data/checkpoints.sqlite", check_same_thread=False)
+    return graph_builder.compile(checkpointer=SqliteSaver(conn))
 
 
 class PFAnalyzerGraphAgent:
@@ -67,7 +71,7 @@ class PFAnalyzerGraphAgent:
         self.session_id = session_id
 
     async def ask(self, query):
-        result = agent.invoke(
+        result = get_agent().invoke(
             {"messages": [HumanMessage(query)]},
             {"configurable": {"thread_id": self.session_id}},
         )
@@ -1,28 +1,102 @@
 # api/chat.py
-from io import BytesIO
+import json
 
-from fastapi import APIRouter, File, Form, Request, UploadFile
+from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
 
-from config.app_context import cas_etl_workflow, pf_analyzer_agent
+from config import app_context
+from services.tool_cache import get_tool_cache
+from utils.serde import get_checkpoint_serde
+from utils.session_ids import PortfolioNotUploadedError, validate_session_id
+from utils.startup_timing import startup_report
 
 router = APIRouter(prefix="/api", tags=["Chat"])
 
 
+def _session_id(request: Request) -> str:
+    # the id names the session's portfolio directory, so reject anything but a plain name
+    try:
+        return validate_session_id(request.headers.get("session_id"))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 @router.post("/chat")
 async def chat_endpoint(request: Request):
     body = await request.json()
     query = body.get("message")
 
-    session_id = request.headers.get("session_id")
-    reply = pf_analyzer_agent.invoke(session_id, query)
+    session_id = _session_id(request)
+    try:
+        reply = await app_context.get_pf_analyzer_agent().ainvoke(session_id, query)
+    except PortfolioNotUploadedError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
     return {"reply": reply}
 
 
-@router.post("/upload")
+@router.post("/chat/stream")
+async def chat_stream_endpoint(request: Request):
+    body = await request.json()
+    query = body.get("message")
+
+    session_id = _session_id(request)
+    events = app_context.get_pf_analyzer_agent().astream(session_id, query)
+    # the portfolio check runs before the first event, so a missing upload is still a 409
+    # rather than an error after the 200 stream has started
+    try:
+        first = await anext(events)
+    except PortfolioNotUploadedError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+    async def event_stream():
+        yield _sse(*first)
+        async for event, data in events:
+            yield _sse(event, data)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@router.post("/upload", status_code=202)
 async def upload_file(request: Request, file: UploadFile = File(...), password: str = Form(...)):
     file_bytes = await file.read()
-    file_stream = BytesIO(file_bytes)
 
-    session_id = request.headers.get("session_id")
-    pf_summary = cas_etl_workflow.invoke(session_id, file_stream, password)
-    return {"reply": pf_summary}
+    session_id = _session_id(request)
+    return app_context.get_upload_jobs().submit(session_id, file_bytes, password)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    if not (job := app_context.get_upload_jobs().get(job_id)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    if not app_context.get_upload_jobs().get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        async for job in app_context.get_upload_jobs().watch(job_id):
+            yield _sse(job["status"], job)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@router.get("/tool-cache/stats")
+async def tool_cache_stats():
+    return get_tool_cache().stats()
+
+
+@router.get("/admin/serializer")
+async def serializer_stats():
+    return get_checkpoint_serde().stats()
+
+
+@router.get("/admin/startup")
+async def startup_timings():
+    return startup_report()
@@ -0,0 +1,115 @@
+"""
+Checkpoint bytes written per chat turn over a long PFAnalyzerAgent session.
+
+The LLM is replaced by a scripted fake model (a tool call followed by an answer on
+every turn) and the checkpointer by a temporary SQLite file, so the numbers only
+reflect graph state serialization.
+
+    poetry run python -m benchmarks.checkpoint_bytes_per_turn --turns 50
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+
+import pandas as pd
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+
+# the agent module builds its ChatOpenAI client at import time; no request is ever sent
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import agents.pf_analyzer_agent as pf_analyzer_agent  # noqa: E402
+import services.session_data as session_data  # noqa: E402
+from services.portfolio_store import PortfolioStore  # noqa: E402
+from utils.db_utils import ThreadLocalSqlite  # noqa: E402
+
+
+def _fake_portfolio(store: PortfolioStore, session_id: str, n_schemes: int = 20) -> str:
+    isins = [f"INF000K01{idx:03d}" for idx in range(n_schemes)]
+    curr_holdings = pd.DataFrame(
+        {
+            "isin": isins,
+            "scheme": [f"Scheme {idx} - Direct Plan - Growth" for idx in range(n_schemes)],
+            "units": 1000.0,
+            "amount": -100000.0,
+            "latest_nav": 123.45,
+            "market_value": 123450.0,
+        }
+    )
+    transactions = curr_holdings[["isin", "scheme"]].assign(
+        amount=-100000.0, date="2020-01-01", type="PURCHASE"
+    )
+    return store.write(
+        session_id,
+        transactions=transactions,
+        curr_holdings=curr_holdings,
+        past_holdings=curr_holdings[["isin", "scheme"]].iloc[:0],
+    )
+
+
+def _bytes_written(conn: sqlite3.Connection, thread_id: str) -> int:
+    (checkpoints,) = conn.execute(
+        "SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints WHERE thread_id = ?",
+        (thread_id,),
+    ).fetchone()
+    (writes,) = conn.execute(
+        "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes WHERE thread_id = ?",
+        (thread_id,),
+    ).fetchone()
+    (messages,) = conn.execute(
+        "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM checkpoint_messages WHERE thread_id = ?",
+        (thread_id,),
+    ).fetchone()
+    return checkpoints + writes + messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    session_id = "benchmark-session"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "checkpoints.sqlite")
+        store = PortfolioStore(os.path.join(tmp_dir, "portfolios"))
+
+        pf_analyzer_agent.get_thread_local_sqlite = lambda: ThreadLocalSqlite(db_path)
+        # the agent reads the prompt context and the tool node the bound datasets
+        pf_analyzer_agent.get_portfolio_store = lambda: store
+        session_data.get_portfolio_store = lambda: store
+        # fresh messages per turn: the add_messages reducer de-duplicates by message id
+        responses = []
+        for turn in range(args.turns):
+            responses.append(
+                AIMessage(
+                    "",
+                    tool_calls=[
+                        {
+                            "name": "get_asset_class_summary",
+                            "args": {"curr_holdings": "var_curr_holdings"},
+                            "id": f"call_{turn}",
+                        }
+                    ],
+                )
+            )
+            responses.append(AIMessage("Your portfolio is 100% equity. " * 10))
+        pf_analyzer_agent.llm_with_tools = FakeMessagesListChatModel(responses=responses)
+
+        agent = pf_analyzer_agent.PFAnalyzerAgent()
+        config = {"configurable": {"thread_id": session_id}}
+        agent.agent.update_state(config, {"portfolio": _fake_portfolio(store, session_id)})
+
+        stats_conn = sqlite3.connect(db_path)
+        previous = _bytes_written(stats_conn, session_id)
+        print(f"{'turn':>5} {'bytes written':>14} {'total bytes':>12}")
+        for turn in range(1, args.turns + 1):
+            agent.invoke(session_id, f"Question {turn}: what is my asset allocation?")
+            total = _bytes_written(stats_conn, session_id)
+            print(f"{turn:>5} {total - previous:>14} {total:>12}")
+            previous = total
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Checkpoint write throughput with N chat sessions running in parallel threads.
+
+Each session runs a minimal two-message graph turn after turn against a temporary
+SQLite file, once with a single connection shared by all threads and once with the
+per-thread connections the sync agents use (utils.db_utils.ThreadLocalSqlite). Expect
+no real difference: graph execution under the GIL dominates. The API's async saver on
+one aiosqlite connection is not measured here.
+
+    poetry run python -m benchmarks.checkpoint_write_throughput --sessions 8 --turns 50
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import StateGraph
+
+from types_ import CASAgentState
+from utils.checkpointer import MessageStoreSqliteSaver
+from utils.db_utils import ThreadLocalSqlite
+
+
+def _reply_node(state: CASAgentState):
+    return {"messages": [AIMessage(f"reply {len(state['messages'])}")]}
+
+
+def _build_graph(checkpointer):
+    graph_builder = StateGraph(CASAgentState)
+    graph_builder.add_node("reply_node", _reply_node)
+    graph_builder.set_entry_point("reply_node")
+    graph_builder.set_finish_point("reply_node")
+    return graph_builder.compile(checkpointer=checkpointer)
+
+
+def _run_session(graph, session_id: str, turns: int) -> int:
+    config = {"configurable": {"thread_id": session_id}}
+    errors = 0
+    for turn in range(turns):
+        try:
+            graph.invoke({"messages": [HumanMessage(f"question {turn}")]}, config=config)
+        except sqlite3.OperationalError:
+            errors += 1
+    return errors
+
+
+def _measure(connections, sessions: int, turns: int) -> tuple[float, int]:
+    graph = _build_graph(MessageStoreSqliteSaver(connections))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        errors = sum(
+            pool.map(lambda idx: _run_session(graph, f"session-{idx}", turns), range(sessions))
+        )
+    return sessions * turns / (time.perf_counter() - started), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{args.sessions} parallel sessions x {args.turns} turns")
+    print(f"{'connections':<16}{'turns/s':>10}{'errors':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        modes = {
+            "shared": lambda: sqlite3.connect(
+                os.path.join(tmp_dir, "shared.sqlite"), check_same_thread=False
+            ),
+            "per-thread": lambda: ThreadLocalSqlite(os.path.join(tmp_dir, "per_thread.sqlite")),
+        }
+        for name, connect in modes.items():
+            connections = connect()
+            turns_per_sec, errors = _measure(connections, args.sessions, args.turns)
+            print(f"{name:<16}{turns_per_sec:>10.1f}{errors:>8}")
+            connections.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Prompt tokens of the portfolio context: indented JSON versus the compact table encoding.
+
+Builds a synthetic monthly-SIP portfolio and reports the token counts of the holdings
+prompt and of typical tool results under both encodings.
+
+    poetry run python -m benchmarks.prompt_tokens --schemes 40 --months 120
+"""
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from config.constants import HOLDINGS_CONTEXT_TOKEN_BUDGET, TOOL_RESULT_TOKEN_BUDGET
+from tools.scheme_returns_tool import get_scheme_wise_returns
+from utils.context_encoder import _get_encoding, count_tokens, encode_table, encode_value
+
+
+def _fake_portfolio(n_schemes: int, months: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    isins = [f"INF000K01{idx:03d}" for idx in range(n_schemes)]
+    schemes = [f"Scheme {idx} Fund - Direct Plan - Growth" for idx in range(n_schemes)]
+    dates = pd.date_range("2015-01-05", periods=months, freq="MS").strftime("%Y-%m-%d")
+
+    navs = rng.uniform(10, 100, size=(n_schemes, months))
+    transactions = pd.DataFrame(
+        {
+            "amount": -5000.0,
+            "date": np.tile(dates, n_schemes),
+            "units": (5000.0 / navs).ravel(),
+            "isin": np.repeat(isins, months),
+            "scheme": np.repeat(schemes, months),
+            "type": "PURCHASE_SIP",
+            "description": "Systematic Investment Purchase",
+        }
+    )
+    curr_holdings = transactions.groupby("isin", as_index=False).agg(
+        scheme=("scheme", "first"), units=("units", "sum"), amount=("amount", "sum")
+    )
+    curr_holdings["latest_nav"] = rng.uniform(10, 100, size=n_schemes)
+    curr_holdings["nav_date"] = "2025-07-04"
+    curr_holdings["market_value"] = curr_holdings["units"] * curr_holdings["latest_nav"]
+    holdings_txns = pd.DataFrame(
+        {
+            "amount": curr_holdings["market_value"],
+            "date": "2025-07-04",
+            "isin": curr_holdings["isin"],
+            "scheme": curr_holdings["scheme"],
+            "type": "HOLDINGS",
+            "description": "Current holdings",
+        }
+    )
+    return pd.concat([transactions, holdings_txns], ignore_index=True), curr_holdings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--schemes", type=int, default=40)
+    parser.add_argument("--months", type=int, default=120)
+    args = parser.parse_args()
+
+    transactions, curr_holdings = _fake_portfolio(args.schemes, args.months)
+    txn_records = transactions.to_dict("records")
+    one_scheme = [txn for txn in txn_records if txn["isin"] == curr_holdings["isin"].iloc[0]]
+
+    cases = {
+        "holdings prompt": (curr_holdings.to_dict("records"), HOLDINGS_CONTEXT_TOKEN_BUDGET),
+        "one scheme's transactions": (one_scheme, TOOL_RESULT_TOKEN_BUDGET),
+        "get_scheme_wise_returns": (
+            get_scheme_wise_returns.invoke({"transactions": transactions}),
+            TOOL_RESULT_TOKEN_BUDGET,
+        ),
+    }
+
+    tokenizer = "tiktoken" if _get_encoding() else "estimated"
+    print(f"{args.schemes} schemes x {args.months} months, token counts ({tokenizer}):")
+    print(f"{'context':<30}{'json indent=2':>15}{'compact':>10}{'budgeted':>10}")
+    for name, (records, budget) in cases.items():
+        as_json = count_tokens(json.dumps(records, indent=2, default=str))
+        compact = count_tokens(encode_table(records))
+        budgeted = count_tokens(encode_value(records, budget))
+        print(f"{name:<30}{as_json:>15}{compact:>10}{budgeted:>10}")
+
+
+if __name__ == "__main__":
+    main()
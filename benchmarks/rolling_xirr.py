@@ -0,0 +1,86 @@
+"""
+Month-end XIRR series of a synthetic SIP portfolio: filtering the transactions and
+solving from scratch for every date versus the prefix-based series with warm starts.
+
+The schemes use made-up ISINs, so values come from the transaction prices (the NAV
+history fallback) and the numbers only reflect the XIRR work.
+
+    poetry run python -m benchmarks.rolling_xirr --schemes 50 --months 120
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from domain.portfolio_valuation import total_value_history, value_history
+from domain.rolling_xirr import rolling_xirr
+from domain.xirr import to_cashflow_arrays, xirr
+
+
+def _fake_transactions(n_schemes: int, months: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2015-01-05", periods=months, freq="MS").strftime("%Y-%m-%d")
+    # NAVs drift up ~12% a year with noise
+    growth = np.exp(np.cumsum(rng.normal(0.01, 0.04, size=(n_schemes, months)), axis=1))
+    navs = rng.uniform(10, 100, size=(n_schemes, 1)) * growth
+    return pd.DataFrame(
+        {
+            "amount": -5000.0,
+            "date": np.tile(dates, n_schemes),
+            "units": (5000.0 / navs).ravel(),
+            "isin": np.repeat([f"INF000K01{idx:03d}" for idx in range(n_schemes)], months),
+            "scheme": np.repeat([f"Scheme {idx}" for idx in range(n_schemes)], months),
+            "type": "PURCHASE_SIP",
+        }
+    )
+
+
+def _naive(txns: pd.DataFrame, end: str) -> int:
+    """Re-filter the transactions and solve cold for every scheme and month end."""
+    history = value_history(txns, "monthly", end)
+    solves = 0
+    for isin, date, value in history[["isin", "date", "value"]].itertuples(index=False):
+        cashflows = txns[(txns["isin"] == isin) & (txns["date"] <= date)][["amount", "date"]]
+        cashflows = pd.concat([cashflows, pd.DataFrame({"amount": [value], "date": [date]})])
+        try:
+            xirr(*to_cashflow_arrays(cashflows))
+        except ValueError:
+            pass
+        solves += 1
+    for date, value in total_value_history(history)[["date", "value"]].itertuples(index=False):
+        cashflows = txns[txns["date"] <= date][["amount", "date"]]
+        cashflows = pd.concat([cashflows, pd.DataFrame({"amount": [value], "date": [date]})])
+        try:
+            xirr(*to_cashflow_arrays(cashflows))
+        except ValueError:
+            pass
+        solves += 1
+    return solves
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--schemes", type=int, default=50)
+    parser.add_argument("--months", type=int, default=120)
+    args = parser.parse_args()
+
+    txns = _fake_transactions(args.schemes, args.months)
+    end = (pd.Timestamp(txns["date"].max()) + pd.offsets.MonthEnd(0)).strftime("%Y-%m-%d")
+
+    started = time.perf_counter()
+    solves = _naive(txns, end)
+    naive_seconds = time.perf_counter() - started
+    print(f"filter + cold solve per date: {naive_seconds:.3f}s ({solves} solves)")
+
+    for warm_start in (False, True):
+        started = time.perf_counter()
+        series = rolling_xirr(txns, end, warm_start=warm_start)
+        seconds = time.perf_counter() - started
+        label = "warm" if warm_start else "cold"
+        print(f"prefix series, {label} start: {seconds:.3f}s ({len(series)} solves)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Per-call overhead of passing a session's transactions to a tool: resolving
+`var_transactions` to records and validating them through `tool.invoke` versus binding
+the stored dataset's read-only columnar view.
+
+The probe tools only count rows, so the numbers are the argument handling alone. The
+synthetic portfolios are written to the portfolio store and deleted afterwards.
+
+    poetry run python -m benchmarks.tool_call_overhead --rows 1000 10000 100000 --calls 20
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from langchain_core.tools import tool
+
+from services.portfolio_store import get_portfolio_store
+from tools.data_refs import Transactions, bind_session_data, data_args
+
+
+@tool
+def count_records(transactions: list) -> int:
+    """Number of transactions."""
+    return len(transactions)
+
+
+@tool
+def count_rows(transactions: Transactions) -> int:
+    """Number of transactions."""
+    return len(transactions)
+
+
+def _fake_transactions(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2010-01-01", periods=5000, freq="D").strftime("%Y-%m-%d")
+    return pd.DataFrame(
+        {
+            "amount": -rng.uniform(500, 5000, n_rows).round(2),
+            "date": np.sort(rng.choice(dates, n_rows)),
+            "units": rng.uniform(1, 100, n_rows),
+            "isin": rng.choice([f"INF000K01{idx:03d}" for idx in range(50)], n_rows),
+            "scheme": "Scheme",
+            "type": "PURCHASE_SIP",
+        }
+    )
+
+
+def _read_records(store, handle: str) -> list[dict]:
+    # how the tool node used to resolve var_transactions
+    df = store.read(handle, "transactions")
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+def _per_call_ms(run, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        run()
+    return (time.perf_counter() - started) / calls * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+
+    store = get_portfolio_store()
+    refs = data_args(count_rows)
+    call_args = {"transactions": "var_transactions"}
+    print(f"{'rows':>10}{'records ms':>14}{'view ms':>10}")
+    for n_rows in args.rows:
+        session_id = f"benchmark-tool-call-{n_rows}"
+        handle = store.write(session_id, transactions=_fake_transactions(n_rows))
+        try:
+            records_ms = _per_call_ms(
+                lambda: count_records.invoke(
+                    {"transactions": _read_records(store, handle)}
+                ),
+                args.calls,
+            )
+            view_ms = _per_call_ms(
+                lambda: count_rows.invoke(bind_session_data(refs, call_args, handle)),
+                args.calls,
+            )
+        finally:
+            store.delete(session_id)
+        print(f"{n_rows:>10}{records_ms:>14.2f}{view_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,153 @@
-from agents.cas_etl_workflow import CasETLWorkflow
-from agents.pf_analyzer_agent import PFAnalyzerAgent
-from services.openai_service import OpenAIService
+import asyncio
+import threading
+from contextlib import asynccontextmanager
 
-llm = OpenAIService()
-cas_etl_workflow = CasETLWorkflow()
-pf_analyzer_agent = PFAnalyzerAgent()
+from config.constants import LLM_CACHE_DB_PATH, RETENTION_INTERVAL_SECONDS, WARMUP_ON_STARTUP
+from utils.db_utils import get_async_sqlite_connection
+from utils.startup_timing import timed
+
+# Components are built on first use so the API process starts without importing
+# LangChain/OpenAI, pandas or SciPy; `warm_up` builds them right after startup instead
+# of on the first request. Builders run on the event loop thread because the async
+# checkpointer binds to the running loop.
+_components: dict = {}
+_lock = threading.RLock()
+_conn = None  # aiosqlite connection opened by `lifespan`
+
+
+def _component(name: str, build):
+    if name not in _components:
+        with _lock:
+            if name not in _components:
+                _components[name] = build()
+    return _components[name]
+
+
+def _build_llm():
+    with timed("llm.import"):
+        from services.openai_service import OpenAIService
+    with timed("llm.init"):
+        return OpenAIService()
+
+
+def _build_llm_cache():
+    with timed("llm_cache.import"):
+        from langchain_community.cache import SQLiteCache
+        from langchain_core.globals import set_llm_cache
+    with timed("llm_cache.init"):
+        set_llm_cache(SQLiteCache(database_path=LLM_CACHE_DB_PATH))
+    return True
+
+
+def _build_checkpointer():
+    with timed("checkpointer.import"):
+        from utils.checkpointer import AsyncMessageStoreSqliteSaver
+    with timed("checkpointer.init"):
+        return AsyncMessageStoreSqliteSaver(_conn)
+
+
+def _build_cas_etl_workflow():
+    _component("llm_cache", _build_llm_cache)
+    checkpointer = get_checkpointer()
+    with timed("cas_etl_workflow.import"):
+        from agents.cas_etl_workflow import CasETLWorkflow
+    with timed("cas_etl_workflow.init"):
+        return CasETLWorkflow(checkpointer)
+
+
+def _build_pf_analyzer_agent():
+    _component("llm_cache", _build_llm_cache)
+    checkpointer = get_checkpointer()
+    with timed("pf_analyzer_agent.import"):
+        from agents.pf_analyzer_agent import PFAnalyzerAgent
+    with timed("pf_analyzer_agent.init"):
+        return PFAnalyzerAgent(checkpointer)
+
+
+def _build_upload_jobs():
+    cas_etl_workflow = get_cas_etl_workflow()
+    with timed("upload_jobs.import"):
+        from services.upload_jobs import UploadJobManager
+    with timed("upload_jobs.init"):
+        return UploadJobManager(cas_etl_workflow)
+
+
+def _build_checkpoint_retention():
+    checkpointer = get_checkpointer()
+    with timed("checkpoint_retention.import"):
+        from services.checkpoint_retention import CheckpointRetention
+    with timed("checkpoint_retention.init"):
+        return CheckpointRetention(serde=checkpointer.serde)
+
+
+def get_llm():
+    return _component("llm", _build_llm)
+
+
+def get_checkpointer():
+    return _component("checkpointer", _build_checkpointer)
+
+
+def get_cas_etl_workflow():
+    return _component("cas_etl_workflow", _build_cas_etl_workflow)
+
+
+def get_pf_analyzer_agent():
+    return _component("pf_analyzer_agent", _build_pf_analyzer_agent)
+
+
+def get_upload_jobs():
+    return _component("upload_jobs", _build_upload_jobs)
+
+
+def get_checkpoint_retention():
+    return _component("checkpoint_retention", _build_checkpoint_retention)
+
+
+def _preload():
+    # the expensive part of warm-up: module imports and reference data, off the loop
+    with timed("warmup.import"):
+        import langchain_community.cache  # noqa: F401
+
+        import agents.cas_etl_workflow  # noqa: F401
+        import agents.pf_analyzer_agent  # noqa: F401
+        import services.checkpoint_retention  # noqa: F401
+        import services.upload_jobs  # noqa: F401
+        import utils.checkpointer  # noqa: F401
+        from domain.reference_data import get_nav_index, get_scheme_category_index
+    with timed("warmup.reference_data"):
+        get_nav_index().load()
+        get_scheme_category_index().load()
+
+
+async def warm_up():
+    with timed("warmup"):
+        await asyncio.to_thread(_preload)
+        get_pf_analyzer_agent()
+        get_upload_jobs()
+        get_checkpoint_retention()
+
+
+async def _run_retention():
+    # first run one interval after startup, not while the worker is coming up
+    await asyncio.sleep(RETENTION_INTERVAL_SECONDS)
+    await get_checkpoint_retention().run_periodically(RETENTION_INTERVAL_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global _conn
+
+    async with get_async_sqlite_connection() as conn:
+        _conn = conn
+        tasks = [asyncio.create_task(_run_retention())]
+        if WARMUP_ON_STARTUP:
+            tasks.append(asyncio.create_task(warm_up()))
+        try:
+            yield
+        finally:
+            for task in tasks:
+                task.cancel()
+            if upload_jobs := _components.get("upload_jobs"):
+                upload_jobs.shutdown()
+            _components.clear()
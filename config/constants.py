@@ -1 +1,55 @@
+import os
+
 SQLITE_DB_PATH = "./data/checkpoints.sqlite"
+LLM_CACHE_DB_PATH = "./data/langgraph_cache.db"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+# checkpoint payloads below this size are stored uncompressed
+CHECKPOINT_COMPRESSION_MIN_BYTES = 256
+
+NAV_ALL_CSV_PATH = "./reference_data/navall.csv"
+SCHEME_DATA_CSV_PATH = "./reference_data/scheme_data.csv"
+SCHEME_CAT_ASSET_CLS_CSV_PATH = "./reference_data/scheme_cat_asset_cls.csv"
+# AMFI NAV history downloads, one or more `;`-separated files (see NavHistoryIndex)
+NAV_HISTORY_DIR = "./reference_data/nav_history"
+# compiled from the reference files above (see domain/reference_bundle.py)
+REFERENCE_BUNDLE_DIR = "./data/reference_bundle"
+
+PORTFOLIO_STORE_DIR = "./data/portfolios"
+
+UPLOAD_PARSER_WORKERS = int(os.getenv("UPLOAD_PARSER_WORKERS", min(4, os.cpu_count() or 1)))
+MAX_UPLOAD_JOBS = 1000
+
+PARSE_CACHE_DIR = "./data/parse_cache"
+PARSE_CACHE_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# adds a short LLM-written commentary under the locally rendered upload summary
+SUMMARY_COMMENTARY = os.getenv("SUMMARY_COMMENTARY", "0") == "1"
+
+# prompt context encoding (see utils/context_encoder.py)
+TOKENIZER_ENCODING = "o200k_base"
+CONTEXT_FLOAT_DIGITS = 2
+HOLDINGS_CONTEXT_TOKEN_BUDGET = int(os.getenv("HOLDINGS_CONTEXT_TOKEN_BUDGET", 4000))
+TOOL_RESULT_TOKEN_BUDGET = int(os.getenv("TOOL_RESULT_TOKEN_BUDGET", 3000))
+
+# tool calls emitted in one LLM step run concurrently, each bounded by this timeout
+TOOL_CALL_TIMEOUT_SECONDS = float(os.getenv("TOOL_CALL_TIMEOUT_SECONDS", 30))
+
+# per-session tool result memoization (see services/tool_cache.py)
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", 2048))
+# open per-session transaction indexes (see services/transaction_index.py)
+TRANSACTION_INDEX_CACHE_SIZE = 64
+# upper bound on the rows one query_transactions call lists (see tools/transaction_query_tool.py)
+TRANSACTION_QUERY_MAX_ROWS = 200
+# open session datasets bound to tool arguments (see services/session_data.py)
+SESSION_DATA_CACHE_SIZE = 128
+
+# checkpoint retention (see services/checkpoint_retention.py)
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", 10))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 30 * 24 * 3600))
+RETENTION_INTERVAL_SECONDS = int(os.getenv("RETENTION_INTERVAL_SECONDS", 3600))
+INCREMENTAL_VACUUM_PAGES = 2000
+# only the API worker holding this lock runs the periodic retention
+RETENTION_LOCK_PATH = "./data/retention.lock"
+
+# build agents and load reference data in the background right after API startup
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
@@ -1,47 +1,87 @@
+import logging
 from datetime import datetime
-from io import StringIO
 
 import casparser
 import pandas as pd
 
+from domain.reference_data import get_nav_index
+
+logger = logging.getLogger(__name__)
+
+# Sign applied to abs(amount) to turn a CAS transaction into an investor cashflow:
+# +1 money received, -1 money invested, 0 no cashflow
+CASHFLOW_SIGNS = {
+    "REDEMPTION": 1,
+    "DIVIDEND_PAYOUT": 1,
+    "SWITCH_OUT": 1,
+    "SWITCH_OUT_MERGER": 1,
+    "REVERSAL": 1,
+    "PURCHASE": -1,
+    "PURCHASE_SIP": -1,
+    "DIVIDEND_REINVEST": -1,
+    "SWITCH_IN": -1,
+    "SWITCH_IN_MERGER": -1,
+    "STT_TAX": -1,  # only if not already netted in redemption
+    "STAMP_DUTY_TAX": -1,
+    "TDS_TAX": -1,
+    "SEGREGATION": 0,
+    "MISC": 0,
+    "UNKNOWN": 0,
+}
+
+TXN_COLUMNS = [
+    "amount",
+    "date",
+    "units",
+    "isin",
+    "scheme",
+    "type",
+    "description",
+]
+
+
+def _to_float(value):
+    return None if value is None else float(value)
+
 
 class CasParser:
     def __init__(self, file_stream, password):
         self.file_stream = file_stream
         self.password = password
 
-    def _get_cashflow_sign(self, txn):
-        positive_types = [
-            "REDEMPTION",
-            "DIVIDEND_PAYOUT",
-            "SWITCH_OUT",
-            "SWITCH_OUT_MERGER",
-            "REVERSAL",
-        ]
-
-        negative_types = [
-            "PURCHASE",
-            "PURCHASE_SIP",
-            "DIVIDEND_REINVEST",
-            "SWITCH_IN",
-            "SWITCH_IN_MERGER",
-            "STT_TAX",  # only if not already netted in redemption
-            "STAMP_DUTY_TAX",
-            "TDS_TAX",
-        ]
-
-        ignore_types = [
-            "SEGREGATION",
-            "MISC",
-            "UNKNOWN",
-        ]
-
-        if txn["type"] in positive_types:
-            return abs(txn["amount"])
-        elif txn["type"] in negative_types:
-            return -abs(txn["amount"])
-        elif txn["type"] in ignore_types:
-            return 0
+    def _build_txns_df(self, cas_data):
+        columns = {col: [] for col in TXN_COLUMNS}
+        for folio in cas_data.folios:
+            for scheme in folio.schemes:
+                scheme_name = scheme.scheme.replace("\n", " ")
+                for txn in scheme.transactions:
+                    columns["amount"].append(_to_float(txn.amount))
+                    columns["date"].append(str(txn.date))
+                    columns["units"].append(_to_float(txn.units))
+                    columns["isin"].append(scheme.isin)
+                    columns["scheme"].append(scheme_name)
+                    columns["type"].append(getattr(txn.type, "value", txn.type))
+                    columns["description"].append(txn.description.replace("\n", " "))
+
+        txns_df = pd.DataFrame(columns)
+        txns_df["amount"] = txns_df["amount"].astype("float64")
+        txns_df["units"] = txns_df["units"].astype("float64")
+        txns_df["type"] = txns_df["type"].astype("category")
+        return txns_df
+
+    def _sign_cashflows(self, txns_df):
+        signs = txns_df["type"].map(CASHFLOW_SIGNS).astype("float64")
+
+        unmapped = signs.isna()
+        if unmapped.any():
+            logger.warning(
+                "Ignoring cashflows of unmapped transaction types: %s",
+                sorted(txns_df.loc[unmapped, "type"].unique()),
+            )
+            signs = signs.fillna(0)
+
+        # Non-cashflow rows carry 0 even when casparser reports no amount
+        return (txns_df["amount"].abs() * signs).where(signs != 0, 0.0)
 
     def _get_current_and_past_holdings(self, txns_df):
         grouped_by_schemes = txns_df.groupby("isin", as_index=False).agg(
@@ -52,18 +92,29 @@ class CasParser:
             }
         )
 
-        curr_holdings = grouped_by_schemes[grouped_by_schemes["units"] >= 0.001]
-        curr_holdings["latest_nav"] = curr_holdings["isin"].map(self.get_latest_nav)
+        curr_holdings = grouped_by_schemes[grouped_by_schemes["units"] >= 0.001].copy()
+        navs = get_nav_index().lookup(curr_holdings["isin"])
+        curr_holdings["latest_nav"] = navs["nav"]
+        curr_holdings["nav_date"] = navs["nav_date"]
         curr_holdings["market_value"] = (
             curr_holdings["units"] * curr_holdings["latest_nav"]
         )
 
-        past_holdings = grouped_by_schemes[grouped_by_schemes["units"] < 0.001]
+        unmatched = curr_holdings.loc[curr_holdings["latest_nav"].isna(), "isin"]
+        if not unmatched.empty:
+            logger.warning(
+                "No NAV in the reference data for ISINs %s; their holdings are not valued",
+                sorted(unmatched.astype(str)),
+            )
+
+        past_holdings = grouped_by_schemes[grouped_by_schemes["units"] < 0.001].copy()
         past_holdings.drop(columns=["units", "amount"], inplace=True)
 
         return curr_holdings, past_holdings
 
     def _merge_curr_holdings_to_txns(self, txns_df, curr_holdings):
+        # holdings without a known NAV have no value to add as a cashflow
+        curr_holdings = curr_holdings[curr_holdings["market_value"].notna()]
         curr_holdings_df = pd.DataFrame(
             {
                 "date": datetime.now().strftime("%Y-%m-%d"),
@@ -74,41 +125,29 @@ class CasParser:
                 "description": "Current holdings",
             }
         )
+        txns_df = txns_df.astype({"type": "object"})
         return pd.concat([txns_df, curr_holdings_df], ignore_index=True)
 
-    def parse(self):
-        txns = casparser.read_cas_pdf(self.file_stream, self.password, output="csv")
-        txns_df = pd.read_csv(StringIO(str(txns)))
-        txns_df["amount"] = txns_df.apply(self._get_cashflow_sign, axis=1)
-
-        # Keep only the specified fields
-        required_columns = [
-            "amount",
-            "date",
-            "units",
-            "isin",
-            "scheme",
-            "type",
-            "description",
-        ]
-        available_columns = [col for col in required_columns if col in txns_df.columns]
-        txns_df = txns_df[available_columns]
+    def read_transactions(self):
+        """Decrypt and parse the PDF into the signed transaction frame."""
+        cas_data = casparser.read_cas_pdf(self.file_stream, self.password, output="dict")
+        txns_df = self._build_txns_df(cas_data)
+        txns_df["amount"] = self._sign_cashflows(txns_df)
+        return txns_df
 
+    def value_holdings(self, txns_df):
+        """Split holdings into current and past and value current ones at the latest NAV."""
         curr_holdings, past_holdings = self._get_current_and_past_holdings(txns_df)
         txns_df = self._merge_curr_holdings_to_txns(txns_df, curr_holdings)
 
         return (
-            txns_df.to_dict(orient="records"),
-            curr_holdings.to_dict(orient="records"),
-            past_holdings.to_dict(orient="records"),
+            txns_df,
+            curr_holdings.reset_index(drop=True),
+            past_holdings.reset_index(drop=True),
         )
 
+    def parse(self):
+        return self.value_holdings(self.read_transactions())
+
     def get_latest_nav(self, isin):
-        df = pd.read_csv("./reference_data/navall.csv", delimiter=";", thousands=",")
-        nav = df.loc[
-            (df["ISIN Div Payout/ ISIN Growth"] == isin)
-            | (df["ISIN Div Reinvestment"] == isin),
-            "Net Asset Value",
-        ].iloc[0]
-
-        return float(nav)
+        return get_nav_index().get_nav(isin)
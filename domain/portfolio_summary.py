@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+SUMMARY_INTRO = (
+    "**Current holdings** are the schemes you still hold units in, valued at the latest "
+    "available NAV. **Past holdings** are schemes you invested in earlier but have fully "
+    "redeemed or switched out of."
+)
+
+
+def holdings_gains(curr_holdings: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-scheme invested amount, market value and gains for the current holdings.
+
+    Cashflows are signed from the investor's side, so the net invested amount is the
+    negated sum of a scheme's transaction amounts. Percentage gain is left undefined
+    when nothing is net invested (e.g. redemptions exceeded purchases).
+    """
+    invested = -curr_holdings["amount"].to_numpy(dtype="float64")
+    market_value = curr_holdings["market_value"].to_numpy(dtype="float64")
+    gain = market_value - invested
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gain_pct = np.where(invested > 0, gain / invested * 100, np.nan)
+
+    return pd.DataFrame(
+        {
+            "scheme": curr_holdings["scheme"].to_numpy(),
+            "invested": invested,
+            "market_value": market_value,
+            "gain": gain,
+            "gain_pct": gain_pct,
+        }
+    )
+
+
+def _fmt_amount(value: float) -> str:
+    return "—" if np.isnan(value) else f"{value:,.2f}"
+
+
+def _fmt_pct(value: float) -> str:
+    return "—" if np.isnan(value) else f"{value:+.2f}%"
+
+
+def _markdown_table(header: list[str], rows: list[list[str]]) -> str:
+    lines = [
+        "| " + " | ".join(header) + " |",
+        "|" + "|".join(["---"] * len(header)) + "|",
+    ]
+    lines += ["| " + " | ".join(row) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def render_portfolio_summary(curr_holdings: pd.DataFrame, past_holdings: pd.DataFrame) -> str:
+    """Render the current and past holdings as a markdown summary."""
+    gains = holdings_gains(curr_holdings)
+
+    # holdings without a known NAV have no value, so the totals only cover valued ones
+    valued = gains["market_value"].notna()
+    unvalued = int((~valued).sum())
+    total_invested = gains.loc[valued, "invested"].sum(min_count=1)
+    total_value = gains.loc[valued, "market_value"].sum(min_count=1)
+    total_gain = total_value - total_invested
+    total_pct = total_gain / total_invested * 100 if total_invested > 0 else np.nan
+
+    curr_rows = [
+        [
+            str(row.scheme).replace("|", "/"),
+            _fmt_amount(row.invested),
+            _fmt_amount(row.market_value),
+            _fmt_amount(row.gain),
+            _fmt_pct(row.gain_pct),
+        ]
+        for row in gains.itertuples(index=False)
+    ]
+    curr_rows.append(
+        [
+            f"**Total (excluding {unvalued} without a NAV)**" if unvalued else "**Total**",
+            f"**{_fmt_amount(total_invested)}**",
+            f"**{_fmt_amount(total_value)}**",
+            f"**{_fmt_amount(total_gain)}**",
+            f"**{_fmt_pct(total_pct)}**",
+        ]
+    )
+
+    sections = [
+        SUMMARY_INTRO,
+        "### Current Holdings",
+        _markdown_table(
+            ["Scheme", "Invested", "Market Value", "Absolute Gain", "Gain %"], curr_rows
+        ),
+        "### Past Holdings",
+    ]
+    if past_holdings.empty:
+        sections.append("No past holdings.")
+    else:
+        sections.append(
+            _markdown_table(
+                ["Scheme"], [[str(scheme).replace("|", "/")] for scheme in past_holdings["scheme"]]
+            )
+        )
+
+    return "\n\n".join(sections)
@@ -0,0 +1,138 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from domain.reference_bundle import NavHistory
+from domain.reference_data import get_nav_history_index, get_nav_index
+
+FREQUENCIES = {"daily": "D", "monthly": "M"}
+
+
+def _date_grid(start: pd.Timestamp, end: pd.Timestamp, freq: str) -> pd.DatetimeIndex:
+    if freq == "D":
+        return pd.date_range(start, end, freq="D")
+    # month ends, with the last point on `end` so the series reaches today
+    month_ends = pd.date_range(start, end, freq="ME")
+    return month_ends.append(pd.DatetimeIndex([end])).unique()
+
+
+def _fallback_navs(txns: pd.DataFrame, isins: np.ndarray) -> NavHistory:
+    """
+    NAV points when the NAV history has no data: the price of each purchase/redemption
+    (amount / units) and the latest NAV from navall.csv. Between points the NAV is
+    carried forward, so values are approximate.
+    """
+    units = txns["units"].to_numpy(dtype="float64")
+    amounts = txns["amount"].to_numpy(dtype="float64")
+    priced = np.isfinite(units) & (units != 0) & (amounts != 0)
+    points = [
+        pd.DataFrame(
+            {
+                "isin": txns["isin"].to_numpy()[priced],
+                "date": txns["date"].to_numpy()[priced],
+                "nav": np.abs(amounts[priced] / units[priced]),
+            }
+        )
+    ]
+    latest = get_nav_index().lookup(isins)
+    points.append(
+        pd.DataFrame({"isin": isins, "date": latest["nav_date"], "nav": latest["nav"]})
+    )
+    return NavHistory.from_frame(pd.concat(points, ignore_index=True))
+
+
+def value_history(txns_df: pd.DataFrame, frequency: str = "monthly", end=None) -> pd.DataFrame:
+    """
+    Per-scheme portfolio value over time.
+
+    Units and net invested capital are accumulated per ISIN as a (dates x schemes) matrix
+    and multiplied by the matching NAV matrix, looked up as of each date in one batch from
+    the NAV history (falling back to transaction prices and the latest NAV for schemes
+    the history does not cover).
+
+    Args:
+        txns_df: signed transactions with isin, scheme, date, units, amount (and type)
+        frequency: "daily" or "monthly" (month ends plus `end`)
+        end: last date of the series, today by default
+
+    Returns:
+        DataFrame with date, isin, scheme, units, nav, invested, value and gain per scheme
+        from its first transaction on; invested is the net amount put in (purchases minus
+        redemptions and payouts)
+    """
+    txns = txns_df
+    if "type" in txns.columns:
+        txns = txns[txns["type"] != "HOLDINGS"]
+    txns = txns.dropna(subset=["isin", "date"])
+    columns = ["date", "isin", "scheme", "units", "nav", "invested", "value", "gain"]
+    if txns.empty:
+        return pd.DataFrame(columns=columns)
+
+    txn_dates = pd.to_datetime(txns["date"], format="%Y-%m-%d").to_numpy(dtype="datetime64[D]")
+    end = pd.Timestamp(end or date.today()).normalize()
+    grid = _date_grid(pd.Timestamp(txn_dates.min()), end, FREQUENCIES[frequency])
+    codes, isins = pd.factorize(txns["isin"])
+    isins = np.asarray(isins, dtype=object)
+
+    # a transaction counts from the first grid date on or after it
+    rows = np.searchsorted(grid.to_numpy(dtype="datetime64[D]"), txn_dates)
+    in_range = rows < len(grid)
+    shape = (len(grid), len(isins))
+    units = np.zeros(shape)
+    invested = np.zeros(shape)
+    np.add.at(
+        units,
+        (rows[in_range], codes[in_range]),
+        np.nan_to_num(txns["units"].to_numpy(dtype="float64")[in_range]),
+    )
+    np.add.at(
+        invested,
+        (rows[in_range], codes[in_range]),
+        -np.nan_to_num(txns["amount"].to_numpy(dtype="float64")[in_range]),
+    )
+    units = np.cumsum(units, axis=0)
+    invested = np.cumsum(invested, axis=0)
+
+    pair_isins = np.tile(isins, len(grid))
+    pair_dates = np.repeat(grid.to_numpy(), len(isins))
+    navs = get_nav_history_index().as_of(pair_isins, pair_dates)["nav"].to_numpy()
+    missing = np.isnan(navs)
+    if missing.any():
+        fallback = _fallback_navs(txns, isins)
+        navs[missing] = fallback.as_of(pair_isins[missing], pair_dates[missing])["nav"]
+    navs = navs.reshape(shape)
+
+    held = units >= 0.001
+    units = np.where(held, units, 0.0)
+    value = np.where(held, units * navs, 0.0)
+    first_rows = np.full(len(isins), len(grid))
+    np.minimum.at(first_rows, codes[in_range], rows[in_range])
+    active = np.arange(len(grid))[:, None] >= first_rows[None, :]
+
+    scheme_names = txns.groupby(codes)["scheme"].first().reindex(range(len(isins)))
+    history = pd.DataFrame(
+        {
+            "date": np.repeat(grid.strftime("%Y-%m-%d").to_numpy(), len(isins)),
+            "isin": pair_isins,
+            "scheme": np.tile(scheme_names.to_numpy(), len(grid)),
+            "units": units.ravel(),
+            "nav": np.where(held, navs, np.nan).ravel(),
+            "invested": invested.ravel(),
+            "value": value.ravel(),
+            "gain": (value - invested).ravel(),
+        }
+    )
+    return history[active.ravel()].reset_index(drop=True)
+
+
+def total_value_history(history: pd.DataFrame) -> pd.DataFrame:
+    """
+    Portfolio totals per date from `value_history`.
+
+    `value` (and so `gain`) is NaN on dates where a held scheme has no NAV at all.
+    """
+    totals = history.groupby("date", sort=True)[["invested", "value"]].sum()
+    totals.loc[history["value"].isna().groupby(history["date"]).any(), "value"] = np.nan
+    totals["gain"] = totals["value"] - totals["invested"]
+    return totals.reset_index()
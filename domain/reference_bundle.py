@@ -0,0 +1,384 @@
+"""
+Binary bundle of the reference CSVs (NAVs, scheme categories, NAV history).
+
+Each table is compiled into a version directory of `.npy` files: a sorted `U12` ISIN
+key array plus one file per column (float64 for numbers, int32 category codes for
+text), with the categories, row count and the size/mtime/sha256 of the source CSVs
+in `meta.json`. Readers memory-map the files, so every worker process shares the
+same page cache instead of parsing and holding its own copy.
+
+    poetry run python -m domain.reference_bundle build
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from config.constants import REFERENCE_BUNDLE_DIR
+
+logger = logging.getLogger(__name__)
+
+META_FILE = "meta.json"
+CURRENT_FILE = "CURRENT"
+ISIN_LENGTH = 12
+# NAV history keys store days since 1970-01-01 shifted into the unsigned low 32 bits
+DAY_BIAS = 1 << 31
+
+
+def _source_stamp(paths) -> dict:
+    stamp = {}
+    for path in paths:
+        stat = os.stat(path)
+        stamp[os.path.basename(path)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return stamp
+
+
+def _table_version(paths, columns: list[dict]) -> str:
+    # same sources and columns -> same table, so a version directory is never rewritten
+    digest = hashlib.sha256(json.dumps([c["name"] for c in columns]).encode())
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def _isin_array(isins) -> np.ndarray:
+    """ISINs as a fixed-width array; anything that is not a 12-character string becomes ""."""
+    isins = pd.Series(isins, dtype="object")
+    return isins.where(isins.str.len() == ISIN_LENGTH, "").to_numpy(dtype=f"U{ISIN_LENGTH}")
+
+
+def _search_isins(keys: np.ndarray, isins) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Position of each ISIN in the sorted `keys` array and whether it is there.
+
+    Holdings and transactions repeat a few ISINs many times, so only the distinct
+    values are cleaned and binary-searched.
+    """
+    codes, uniques = pd.factorize(pd.Series(isins, dtype="object"))
+    if not len(keys):
+        return np.zeros(len(codes), dtype=np.intp), np.zeros(len(codes), dtype=bool)
+    uniques = _isin_array(uniques)
+    positions = np.minimum(np.searchsorted(keys, uniques), len(keys) - 1)
+    found = keys[positions] == uniques
+    # missing ISINs have code -1 and pick the appended "not found" entry
+    return np.append(positions, 0)[codes], np.append(found, False)[codes]
+
+
+class ReferenceTable:
+    """
+    ISIN-keyed table as a sorted key array with aligned column arrays.
+
+    Lookups binary-search the key array, so they work the same on in-memory arrays and
+    on memory-mapped bundle files.
+    """
+
+    def __init__(self, keys: np.ndarray, columns: dict[str, np.ndarray], categories: dict):
+        self.keys = keys
+        self.columns = columns
+        self.categories = categories
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ReferenceTable":
+        """Build from a DataFrame indexed by unique ISINs."""
+        keys = df.index.to_numpy().astype(f"U{ISIN_LENGTH}")
+        order = np.argsort(keys, kind="stable")
+        columns, categories = {}, {}
+        for name, series in df.items():
+            series = series.iloc[order]
+            if pd.api.types.is_numeric_dtype(series):
+                columns[name] = series.to_numpy(dtype=np.float64)
+            else:
+                categorical = pd.Categorical(series.astype("object").where(series.notna(), None))
+                columns[name] = categorical.codes.astype(np.int32)
+                categories[name] = [str(c) for c in categorical.categories]
+        return cls(keys[order], columns, categories)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, isin: str) -> bool:
+        position = np.searchsorted(self.keys, isin)
+        return bool(position < len(self.keys) and self.keys[position] == isin)
+
+    def lookup(self, isins) -> dict[str, np.ndarray]:
+        """Column values for each of `isins` (NaN for unknown or malformed ISINs)."""
+        positions, found = _search_isins(self.keys, isins)
+        result = {}
+        if not len(self.keys):
+            for name in self.columns:
+                dtype = object if name in self.categories else np.float64
+                result[name] = np.full(len(found), np.nan, dtype=dtype)
+            return result
+
+        for name, values in self.columns.items():
+            if name in self.categories:
+                # code -1 (missing) picks the trailing NaN
+                labels = np.array([*self.categories[name], np.nan], dtype=object)
+                result[name] = labels[np.where(found, values[positions], -1)]
+            else:
+                result[name] = np.where(found, values[positions], np.nan)
+        return result
+
+    def save(self, directory: str):
+        os.makedirs(directory)
+        np.save(os.path.join(directory, "keys.npy"), self.keys)
+        columns = []
+        for idx, (name, values) in enumerate(self.columns.items()):
+            np.save(os.path.join(directory, f"{idx}.npy"), values)
+            column = {"name": name, "kind": "numeric"}
+            if name in self.categories:
+                column = {"name": name, "kind": "category", "categories": self.categories[name]}
+            columns.append(column)
+        return columns
+
+    @classmethod
+    def open(cls, directory: str, columns_meta: list[dict]) -> "ReferenceTable":
+        """Memory-map a table written by `save`."""
+        keys = np.load(os.path.join(directory, "keys.npy"), mmap_mode="r")
+        columns, categories = {}, {}
+        for idx, column in enumerate(columns_meta):
+            columns[column["name"]] = np.load(
+                os.path.join(directory, f"{idx}.npy"), mmap_mode="r"
+            )
+            if column["kind"] == "category":
+                categories[column["name"]] = column["categories"]
+        return cls(keys, columns, categories)
+
+
+class NavHistory:
+    """
+    Per-scheme, date-sorted NAV series for point-in-time lookups.
+
+    Rows are ordered by (scheme, date) and addressed by one int64 key per row,
+    `scheme_index << 32 | day`, where `scheme_index` is the position of the ISIN in the
+    sorted `isins` array and `day` the biased day number. Keys are globally sorted, so a
+    whole batch of (ISIN, date) as-of queries is answered by a single binary search over
+    `keys`; `offsets[i]:offsets[i + 1]` is the row range of scheme `i`.
+    """
+
+    def __init__(self, isins: np.ndarray, offsets: np.ndarray, keys: np.ndarray, navs):
+        self.isins = isins
+        self.offsets = offsets
+        self.keys = keys
+        self.navs = navs
+
+    @staticmethod
+    def _days(dates) -> np.ndarray:
+        return pd.DatetimeIndex(pd.to_datetime(dates)).to_numpy(dtype="datetime64[D]")
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "NavHistory":
+        """
+        Build from a frame with `isin`, `date` and `nav` columns.
+
+        For repeated (ISIN, date) rows the last one wins, so later history files override
+        earlier ones.
+        """
+        df = df.dropna(subset=["isin", "date", "nav"])
+        isins, scheme_index = np.unique(_isin_array(df["isin"]), return_inverse=True)
+        days = cls._days(df["date"]).astype(np.int64) + DAY_BIAS
+        keys = (scheme_index.astype(np.int64) << 32) | days
+        order = np.argsort(keys, kind="stable")
+        keys, navs = keys[order], df["nav"].to_numpy(dtype=np.float64)[order]
+
+        last = np.ones(len(keys), dtype=bool)
+        last[:-1] = keys[1:] != keys[:-1]
+        keys, navs = keys[last], navs[last]
+        if len(isins) and isins[0] == "":
+            # malformed ISINs sort first; drop their rows and renumber the schemes
+            start = np.searchsorted(keys, 1 << 32)
+            keys, navs, isins = keys[start:] - (1 << 32), navs[start:], isins[1:]
+        offsets = np.searchsorted(keys, np.arange(len(isins) + 1, dtype=np.int64) << 32)
+        return cls(isins, offsets, keys, navs)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, isin: str) -> bool:
+        position = np.searchsorted(self.isins, isin)
+        return bool(position < len(self.isins) and self.isins[position] == isin)
+
+    def _key_dates(self, keys: np.ndarray) -> np.ndarray:
+        return ((keys & 0xFFFFFFFF) - DAY_BIAS).astype("datetime64[D]")
+
+    def as_of(self, isins, dates) -> dict[str, np.ndarray]:
+        """
+        NAV of each (ISIN, date) pair on the latest NAV date on or before `date`.
+
+        Returns:
+            dict with `nav` (NaN when the scheme is unknown or has no NAV by then) and
+            `nav_date` (NaT likewise) arrays aligned with the pairs
+        """
+        scheme, known = _search_isins(self.isins, isins)
+        days = np.broadcast_to(self._days(np.atleast_1d(dates)), len(scheme))
+        nav = np.full(len(scheme), np.nan)
+        nav_date = np.full(len(scheme), np.datetime64("NaT"), dtype="datetime64[D]")
+        if not len(self.isins):
+            return {"nav": nav, "nav_date": nav_date}
+
+        known &= ~np.isnat(days)
+        query_keys = (scheme.astype(np.int64) << 32) | (
+            np.where(known, days.astype(np.int64), 0) + DAY_BIAS
+        )
+        position = np.searchsorted(self.keys, query_keys, side="right") - 1
+        found = known & (position >= self.offsets[scheme])
+        position = position[found]
+        nav[found] = self.navs[position]
+        nav_date[found] = self._key_dates(self.keys[position])
+        return {"nav": nav, "nav_date": nav_date}
+
+    def lookup(self, isins) -> dict[str, np.ndarray]:
+        """Latest NAV in the history for each of `isins`."""
+        scheme, found = _search_isins(self.isins, isins)
+        nav = np.full(len(scheme), np.nan)
+        nav_date = np.full(len(scheme), np.datetime64("NaT"), dtype="datetime64[D]")
+        position = self.offsets[scheme[found] + 1] - 1
+        nav[found] = self.navs[position]
+        nav_date[found] = self._key_dates(self.keys[position])
+        return {"nav": nav, "nav_date": nav_date}
+
+    def series(self, isin: str) -> pd.Series:
+        """The full NAV series of one scheme, indexed by date (empty if unknown)."""
+        if isin not in self:
+            return pd.Series(dtype=np.float64, index=pd.DatetimeIndex([]), name=isin)
+        scheme = np.searchsorted(self.isins, isin)
+        rows = slice(self.offsets[scheme], self.offsets[scheme + 1])
+        return pd.Series(
+            np.asarray(self.navs[rows]),
+            index=pd.DatetimeIndex(self._key_dates(self.keys[rows])),
+            name=isin,
+        )
+
+    def save(self, directory: str):
+        os.makedirs(directory)
+        for name in ("isins", "offsets", "keys", "navs"):
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        return [{"name": "nav", "kind": "numeric"}, {"name": "nav_date", "kind": "key"}]
+
+    @classmethod
+    def open(cls, directory: str, columns_meta: list[dict]) -> "NavHistory":
+        """Memory-map a history written by `save`."""
+        return cls(
+            *(
+                np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+                for name in ("isins", "offsets", "keys", "navs")
+            )
+        )
+
+
+class ReferenceBundle:
+    """
+    Versioned on-disk store of compiled reference tables.
+
+    A table lives under `<root>/<name>/<version>/`; `<root>/<name>/CURRENT` names the
+    live version and is replaced atomically, so readers never see a partial build.
+    """
+
+    def __init__(self, root: str = REFERENCE_BUNDLE_DIR):
+        self.root = root
+
+    def write(self, name: str, table: ReferenceTable, source_paths) -> str:
+        """Store `table` compiled from `source_paths` and make it current."""
+        table_dir = os.path.join(self.root, name)
+        tmp_dir = os.path.join(table_dir, f".{uuid.uuid4().hex}.tmp")
+        columns = table.save(os.path.join(tmp_dir, "table"))
+        version = _table_version(source_paths, columns)
+
+        meta = {
+            "version": version,
+            "rows": len(table),
+            "sources": _source_stamp(source_paths),
+            "columns": columns,
+        }
+        with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+            json.dump(meta, f)
+
+        version_dir = os.path.join(table_dir, version)
+        try:
+            os.rename(tmp_dir, version_dir)
+        except OSError:
+            # built before (or by another worker) from the same source content; only the
+            # source mtimes may differ, so refresh the stamp
+            os.replace(os.path.join(tmp_dir, META_FILE), os.path.join(version_dir, META_FILE))
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        current_tmp = os.path.join(table_dir, f".{CURRENT_FILE}.{uuid.uuid4().hex}")
+        with open(current_tmp, "w") as f:
+            f.write(version)
+        os.replace(current_tmp, os.path.join(table_dir, CURRENT_FILE))
+
+        # mapped files of old versions stay readable for processes still using them
+        for entry in os.listdir(table_dir):
+            if entry not in (version, CURRENT_FILE) and not entry.startswith("."):
+                shutil.rmtree(os.path.join(table_dir, entry), ignore_errors=True)
+        return version
+
+    def read(self, name: str, source_paths, table_cls=None, columns=None):
+        """
+        Memory-map the current version of a table (a `ReferenceTable` by default).
+
+        Returns None when there is no bundle, the source CSVs changed since it was built
+        or its columns differ from `columns` (when given).
+        """
+        table_dir = os.path.join(self.root, name)
+        try:
+            with open(os.path.join(table_dir, CURRENT_FILE)) as f:
+                version_dir = os.path.join(table_dir, f.read().strip())
+            with open(os.path.join(version_dir, META_FILE)) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        stale = meta["sources"] != _source_stamp(source_paths) or (
+            columns is not None and [c["name"] for c in meta["columns"]] != list(columns)
+        )
+        if stale:
+            logger.info("Reference bundle %s is stale; rebuilding from CSV", name)
+            return None
+        table_cls = table_cls or ReferenceTable
+        try:
+            return table_cls.open(os.path.join(version_dir, "table"), meta["columns"])
+        except (OSError, ValueError):
+            logger.warning("Reference bundle %s is unreadable; rebuilding from CSV", name)
+            return None
+
+    def version(self, name: str) -> str | None:
+        try:
+            with open(os.path.join(self.root, name, CURRENT_FILE)) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+
+def main():
+    from domain.reference_data import NavHistoryIndex, NavIndex, SchemeCategoryIndex
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--dir", default=REFERENCE_BUNDLE_DIR)
+    args = parser.parse_args()
+
+    bundle = ReferenceBundle(args.dir)
+    result = {}
+    indexes = (
+        NavIndex(bundle=bundle),
+        SchemeCategoryIndex(bundle=bundle),
+        NavHistoryIndex(bundle=bundle),
+    )
+    for index in indexes:
+        version = index.build_bundle()
+        result[index.bundle_name] = {"version": version, "rows": len(index.table)}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+import logging
+import os
+import threading
+from functools import cache
+
+import pandas as pd
+
+from config.constants import (
+    NAV_ALL_CSV_PATH,
+    NAV_HISTORY_DIR,
+    SCHEME_CAT_ASSET_CLS_CSV_PATH,
+    SCHEME_DATA_CSV_PATH,
+)
+from domain.reference_bundle import NavHistory, ReferenceBundle, ReferenceTable
+
+logger = logging.getLogger(__name__)
+
+ISIN_PATTERN = r"([A-Z]{2}[A-Z0-9]{9}[0-9])"
+
+
+class _ReferenceIndex:
+    """
+    Lazily loaded ISIN lookup table over one or more reference CSV files.
+
+    The table is memory-mapped from the compiled reference bundle when one matches the
+    source files; otherwise it is parsed from the CSVs (`_load`) and written to the
+    bundle, so the next process maps it instead. It is reloaded only when the mtime of
+    any of the source files changes. Subclasses implement `_load`.
+    """
+
+    columns: list[str] = []
+    bundle_name: str = ""
+    table_cls = ReferenceTable
+
+    def __init__(self, *paths: str, bundle: ReferenceBundle | None = None):
+        self.paths = paths
+        self.bundle = bundle or ReferenceBundle()
+        self._lock = threading.Lock()
+        self._mtimes = None
+        self._table = None
+
+    def _source_paths(self) -> list[str]:
+        return list(self.paths)
+
+    def _source_mtimes(self, paths: list[str]) -> tuple:
+        return tuple((path, os.stat(path).st_mtime_ns) for path in paths)
+
+    def _load(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def _compile(self, paths: list[str]):
+        table = self.table_cls.from_frame(self._load())
+        try:
+            self.bundle.write(self.bundle_name, table, paths)
+        except OSError:
+            logger.warning("Could not write reference bundle %s", self.bundle_name, exc_info=True)
+        return table
+
+    def _ensure_fresh(self):
+        paths = self._source_paths()
+        mtimes = self._source_mtimes(paths)
+        if mtimes == self._mtimes:
+            return
+        with self._lock:
+            if mtimes != self._mtimes:
+                table = self.bundle.read(self.bundle_name, paths, self.table_cls, self.columns)
+                self._table = self._compile(paths) if table is None else table
+                self._mtimes = mtimes
+
+    @property
+    def table(self):
+        self._ensure_fresh()
+        return self._table
+
+    def load(self):
+        """Load the table now (e.g. during warm-up) rather than on the first lookup."""
+        self._ensure_fresh()
+
+    def build_bundle(self) -> str:
+        """Recompile the bundle from the source CSVs and return its version."""
+        with self._lock:
+            paths = self._source_paths()
+            self._table = self.table_cls.from_frame(self._load())
+            self._mtimes = self._source_mtimes(paths)
+            return self.bundle.write(self.bundle_name, self._table, paths)
+
+    def lookup(self, isins) -> pd.DataFrame:
+        """
+        Batch lookup for a sequence of ISINs.
+
+        Args:
+            isins: Series or list of ISINs
+
+        Returns:
+            DataFrame aligned with `isins` holding the index columns (NaN for unknown ISINs)
+        """
+        isins = pd.Series(isins)
+        return pd.DataFrame(self.table.lookup(isins), index=isins.index, columns=self.columns)
+
+
+class NavIndex(_ReferenceIndex):
+    """
+    Process-wide ISIN -> latest NAV lookup built from AMFI's navall.csv.
+
+    Both the growth/payout ISIN and the reinvestment ISIN of a scheme map to the same
+    NAV row.
+    """
+
+    columns = ["nav", "nav_date"]
+    bundle_name = "nav"
+
+    def __init__(self, path: str = NAV_ALL_CSV_PATH, bundle: ReferenceBundle | None = None):
+        super().__init__(path, bundle=bundle)
+
+    def _load(self):
+        df = pd.read_csv(self.paths[0], delimiter=";", thousands=",", dtype=str)
+        navs = pd.DataFrame(
+            {
+                "nav": pd.to_numeric(df["Net Asset Value"], errors="coerce"),
+                "nav_date": pd.to_datetime(df["Date"], format="%d-%b-%Y", errors="coerce")
+                .dt.strftime("%Y-%m-%d"),
+            }
+        )
+
+        by_isin = pd.concat(
+            [
+                navs.set_index(df["ISIN Div Payout/ ISIN Growth"]),
+                navs.set_index(df["ISIN Div Reinvestment"]),
+            ]
+        )
+        by_isin = by_isin[by_isin.index.str.len() == 12]
+        # navall.csv lists a scheme once; keep the first row like the old row filter did
+        return by_isin[~by_isin.index.duplicated(keep="first")]
+
+    def get_nav(self, isin: str) -> float:
+        table = self.table
+        if isin not in table:
+            raise KeyError(isin)
+        return float(table.lookup([isin])["nav"][0])
+
+
+class SchemeCategoryIndex(_ReferenceIndex):
+    """
+    ISIN -> (scheme category, asset class, AMC) lookup built from scheme_data.csv.
+
+    scheme_data.csv stores the payout/growth and reinvestment ISINs of a scheme as one
+    concatenated string; they are split into one row per ISIN and joined with
+    scheme_cat_asset_cls.csv up front.
+    """
+
+    columns = ["scheme_category", "asset_class", "amc"]
+    bundle_name = "scheme_category"
+
+    def __init__(
+        self,
+        scheme_data_path: str = SCHEME_DATA_CSV_PATH,
+        asset_cls_path: str = SCHEME_CAT_ASSET_CLS_CSV_PATH,
+        bundle: ReferenceBundle | None = None,
+    ):
+        super().__init__(scheme_data_path, asset_cls_path, bundle=bundle)
+
+    def _load(self):
+        scheme_data = pd.read_csv(self.paths[0], dtype=str)
+        scheme_cat_asset_cls_df = pd.read_csv(self.paths[1], dtype=str)
+
+        isins = scheme_data["ISIN Div Payout/ ISIN GrowthISIN Div Reinvestment"].str.extractall(
+            ISIN_PATTERN
+        )[0]
+        categories = pd.DataFrame(
+            {
+                "isin": isins.to_numpy(),
+                "scheme_category": scheme_data["Scheme Category"]
+                .loc[isins.index.get_level_values(0)]
+                .to_numpy(),
+                "amc": scheme_data["AMC"].loc[isins.index.get_level_values(0)].to_numpy(),
+            }
+        ).drop_duplicates("isin", keep="first")
+
+        categories = categories.merge(
+            scheme_cat_asset_cls_df,
+            left_on="scheme_category",
+            right_on="scheme_cat",
+            how="left",
+        )
+        return categories.set_index("isin")[self.columns]
+
+
+class NavHistoryIndex(_ReferenceIndex):
+    """
+    Point-in-time NAV lookups over AMFI NAV history files.
+
+    Every `.csv`/`.txt` file in `directory` is read as an AMFI "NAV history" download
+    (`;`-separated, with scheme-type and AMC title lines between the rows); navall.csv
+    snapshots use the same columns and can be dropped in as well. Rows are compiled
+    into a `NavHistory` and answer as-of queries with one binary search per batch.
+    """
+
+    columns = ["nav", "nav_date"]
+    bundle_name = "nav_history"
+    table_cls = NavHistory
+
+    def __init__(self, directory: str = NAV_HISTORY_DIR, bundle: ReferenceBundle | None = None):
+        super().__init__(bundle=bundle)
+        self.directory = directory
+
+    def _source_paths(self) -> list[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            os.path.join(self.directory, name)
+            for name in sorted(os.listdir(self.directory))
+            if name.endswith((".csv", ".txt"))
+        ]
+
+    @staticmethod
+    def _read_history_file(path: str) -> pd.DataFrame:
+        df = pd.read_csv(
+            path,
+            delimiter=";",
+            thousands=",",
+            dtype=str,
+            on_bad_lines="skip",
+            usecols=lambda c: c.startswith(("ISIN", "Net Asset Value", "Date")),
+        )
+        navs = pd.DataFrame(
+            {
+                "nav": pd.to_numeric(df["Net Asset Value"], errors="coerce"),
+                "date": pd.to_datetime(df["Date"], format="%d-%b-%Y", errors="coerce"),
+            }
+        )
+        isin_columns = [c for c in df.columns if c.startswith("ISIN")]
+        return pd.concat([navs.assign(isin=df[column]) for column in isin_columns])
+
+    def _load(self):
+        frames = [self._read_history_file(path) for path in self._source_paths()]
+        if not frames:
+            return pd.DataFrame(columns=["isin", "date", "nav"])
+        return pd.concat(frames, ignore_index=True)
+
+    def as_of(self, isins, dates) -> pd.DataFrame:
+        """
+        Batch point-in-time lookup.
+
+        Args:
+            isins: Series or list of ISINs
+            dates: dates aligned with `isins`, or a single date for all of them
+
+        Returns:
+            DataFrame aligned with `isins` with the NAV on the latest NAV date on or
+            before each date (`nav`, `nav_date`; NaN/NaT if there is none)
+        """
+        isins = pd.Series(isins)
+        return pd.DataFrame(self.table.as_of(isins, dates), index=isins.index)
+
+    def series(self, isin: str) -> pd.Series:
+        return self.table.series(isin)
+
+
+@cache
+def get_nav_index(path: str = NAV_ALL_CSV_PATH) -> NavIndex:
+    return NavIndex(path)
+
+
+@cache
+def get_scheme_category_index(
+    scheme_data_path: str = SCHEME_DATA_CSV_PATH,
+    asset_cls_path: str = SCHEME_CAT_ASSET_CLS_CSV_PATH,
+) -> SchemeCategoryIndex:
+    return SchemeCategoryIndex(scheme_data_path, asset_cls_path)
+
+
+@cache
+def get_nav_history_index(directory: str = NAV_HISTORY_DIR) -> NavHistoryIndex:
+    return NavHistoryIndex(directory)
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from domain.portfolio_valuation import total_value_history, value_history
+from domain.xirr import PORTFOLIO_ISIN, PORTFOLIO_SCHEME, xirr
+
+DEFAULT_GUESS = 0.1
+
+
+def _day_numbers(dates) -> np.ndarray:
+    return pd.to_datetime(dates, format="%Y-%m-%d").to_numpy(dtype="datetime64[D]").astype(np.int64)
+
+
+def _xirr_series(
+    days: np.ndarray,
+    amounts: np.ndarray,
+    grid_days: np.ndarray,
+    values: np.ndarray,
+    warm_start: bool = True,
+) -> np.ndarray:
+    """
+    XIRR as of each grid date: the cashflows up to that date plus the value on it as a
+    final inflow.
+
+    `days` must be sorted, so the cashflows up to a date are a prefix of the arrays whose
+    length is found by binary search; no per-date filtering. With `warm_start` each solve
+    starts from the previous date's rate, which is usually a few Newton steps away.
+    """
+    prefix_lengths = np.searchsorted(days, grid_days, side="right")
+    rates = np.full(len(grid_days), np.nan)
+    guess = DEFAULT_GUESS
+    for idx, (length, day, value) in enumerate(zip(prefix_lengths, grid_days, values)):
+        if not length or not np.isfinite(value):
+            continue
+        try:
+            rate = xirr(np.append(amounts[:length], value), np.append(days[:length], day), guess)
+        except ValueError:
+            continue
+        rates[idx] = rate
+        if warm_start:
+            guess = rate
+    return rates
+
+
+def rolling_xirr(txns_df: pd.DataFrame, end=None, warm_start: bool = True) -> pd.DataFrame:
+    """
+    XIRR as of every month end (and `end`) per scheme and for the whole portfolio.
+
+    Args:
+        txns_df: signed transactions with isin, scheme, date, units, amount (and type)
+        end: last date of the series, today by default
+        warm_start: seed each solve with the previous month's rate
+
+    Returns:
+        DataFrame with date, isin (PORTFOLIO for the total), scheme, invested, value and
+        xirr (in %, NaN where it is undefined or does not converge)
+    """
+    history = value_history(txns_df, "monthly", end)
+    columns = ["date", "isin", "scheme", "invested", "value", "xirr"]
+    if history.empty:
+        return pd.DataFrame(columns=columns)
+
+    txns = txns_df
+    if "type" in txns.columns:
+        txns = txns[txns["type"] != "HOLDINGS"]
+    txns = txns.dropna(subset=["isin", "date", "amount"])
+    txns = txns[txns["amount"] != 0]
+    days = _day_numbers(txns["date"])
+    amounts = txns["amount"].to_numpy(dtype="float64")
+    isins = txns["isin"].to_numpy()
+
+    # sorted once by (isin, day): every scheme is a contiguous, date-sorted slice
+    order = np.lexsort((days, isins))
+    days_by_isin, amounts_by_isin, sorted_isins = days[order], amounts[order], isins[order]
+    series = []
+    for isin, scheme_history in history.groupby("isin", sort=False):
+        first = np.searchsorted(sorted_isins, isin)
+        last = np.searchsorted(sorted_isins, isin, side="right")
+        rates = _xirr_series(
+            days_by_isin[first:last],
+            amounts_by_isin[first:last],
+            _day_numbers(scheme_history["date"]),
+            scheme_history["value"].to_numpy(),
+            warm_start,
+        )
+        series.append(scheme_history[columns[:-1]].assign(xirr=rates * 100))
+
+    totals = total_value_history(history)
+    order = np.argsort(days, kind="stable")
+    rates = _xirr_series(
+        days[order],
+        amounts[order],
+        _day_numbers(totals["date"]),
+        totals["value"].to_numpy(),
+        warm_start,
+    )
+    series.append(
+        totals.assign(isin=PORTFOLIO_ISIN, scheme=PORTFOLIO_SCHEME, xirr=rates * 100)[columns]
+    )
+    return pd.concat(series, ignore_index=True)
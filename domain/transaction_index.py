@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+
+from domain.reference_data import get_scheme_category_index
+
+# columns with a posting list: row numbers grouped by the column's category code
+POSTING_COLUMNS = ["amc", "scheme_category", "type"]
+CODED_COLUMNS = ["isin", "date", *POSTING_COLUMNS]
+RESULT_COLUMNS = ["date", "isin", "scheme", "type", "amount", "units"]
+GROUP_BY_COLUMNS = ["isin", "scheme", "amc", "scheme_category", "type", "year"]
+HOLDINGS_TYPE = "HOLDINGS"
+
+
+def prepare_transactions(txns_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tag transactions with their AMC and scheme category and sort them by (isin, date).
+
+    Rows without an ISIN come first, so the ISIN codes of the stored frame are sorted.
+    """
+    categories = get_scheme_category_index().lookup(txns_df["isin"])
+    txns = txns_df.assign(
+        amc=categories["amc"].to_numpy(),
+        scheme_category=categories["scheme_category"].to_numpy(),
+    )
+    return txns.sort_values(
+        ["isin", "date"], kind="stable", na_position="first", ignore_index=True
+    )
+
+
+def _categorical(series) -> pd.Categorical:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.array
+    # same encoding as PortfolioStore, so codes match the stored ones
+    return pd.Categorical(series.astype("object").where(series.notna(), None))
+
+
+def build_postings(txns: pd.DataFrame) -> pd.DataFrame:
+    """Row numbers of the prepared transactions ordered by each posting column's code."""
+    return pd.DataFrame(
+        {
+            column: np.argsort(_categorical(txns[column]).codes, kind="stable").astype(np.int32)
+            for column in POSTING_COLUMNS
+        }
+    )
+
+
+def _matching_codes(categories: pd.Index, value: str) -> np.ndarray:
+    # exact (case-insensitive) match first, then any category containing the value
+    labels = categories.astype(str).str.lower()
+    value = value.strip().lower()
+    matches = np.flatnonzero(labels == value)
+    if not matches.size:
+        matches = np.flatnonzero(labels.str.contains(value, regex=False))
+    return matches
+
+
+class TransactionIndex:
+    """
+    Query index over a session's prepared transactions.
+
+    Rows are sorted by (isin, date), so an ISIN is a contiguous row range found by binary
+    search over its category codes. AMC, scheme category and type have posting lists
+    (`build_postings`): row numbers ordered by code, sliced with per-code offsets. Dates
+    are "YYYY-MM-DD" categories, whose codes sort like the dates, so a date range is a
+    code range. Queries only touch the matching rows.
+    """
+
+    def __init__(self, transactions: pd.DataFrame, postings: pd.DataFrame):
+        self.transactions = transactions
+        self.codes = {}
+        self.categories = {}
+        for column in CODED_COLUMNS:
+            categorical = _categorical(transactions[column])
+            self.codes[column] = categorical.codes
+            self.categories[column] = categorical.categories
+        self.postings = {}
+        for column in POSTING_COLUMNS:
+            # codes start at -1 (missing), so bincount over code + 1
+            counts = np.bincount(
+                self.codes[column] + 1, minlength=len(self.categories[column]) + 1
+            )
+            offsets = np.concatenate([[0], np.cumsum(counts)])[1:]
+            self.postings[column] = (postings[column].to_numpy(), offsets)
+
+    @classmethod
+    def from_frame(cls, txns_df: pd.DataFrame) -> "TransactionIndex":
+        """Index transactions that were stored without one (built in memory)."""
+        txns = prepare_transactions(txns_df)
+        return cls(txns, build_postings(txns))
+
+    def __len__(self) -> int:
+        return len(self.transactions)
+
+    def _isin_rows(self, isin: str) -> np.ndarray:
+        code = self.categories["isin"].get_indexer([isin])[0]
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        codes = self.codes["isin"]
+        return np.arange(
+            np.searchsorted(codes, code, side="left"), np.searchsorted(codes, code, side="right")
+        )
+
+    def _posting_rows(self, column: str, value: str) -> np.ndarray:
+        rows, offsets = self.postings[column]
+        slices = [
+            rows[offsets[code] : offsets[code + 1]]
+            for code in _matching_codes(self.categories[column], value)
+        ]
+        return np.sort(np.concatenate(slices)) if slices else np.empty(0, dtype=np.int64)
+
+    def rows(
+        self,
+        isin: str | None = None,
+        amc: str | None = None,
+        scheme_category: str | None = None,
+        transaction_type: str | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+    ) -> np.ndarray:
+        """
+        Row numbers matching all given filters, in (isin, date) order.
+
+        AMC, scheme category and type match case-insensitively, falling back to a
+        substring match; dates are inclusive "YYYY-MM-DD" bounds. HOLDINGS rows (current
+        value) are only returned when asked for by type.
+        """
+        selections = []
+        if isin:
+            selections.append(self._isin_rows(isin.strip().upper()))
+        for column, value in (
+            ("amc", amc),
+            ("scheme_category", scheme_category),
+            ("type", transaction_type),
+        ):
+            if value:
+                selections.append(self._posting_rows(column, value))
+
+        if selections:
+            rows = selections[0]
+            for selection in selections[1:]:
+                rows = np.intersect1d(rows, selection, assume_unique=True)
+        else:
+            rows = np.arange(len(self))
+
+        keep = np.ones(len(rows), dtype=bool)
+        if start_date or end_date:
+            date_codes = self.codes["date"][rows]
+            dates = self.categories["date"]
+            if start_date:
+                keep &= date_codes >= dates.searchsorted(start_date, side="left")
+            if end_date:
+                keep &= date_codes < dates.searchsorted(end_date, side="right")
+            keep &= date_codes >= 0
+        holdings = self.categories["type"].get_indexer([HOLDINGS_TYPE])[0]
+        if not transaction_type and holdings >= 0:
+            keep &= self.codes["type"][rows] != holdings
+        return rows[keep]
+
+    def select(self, rows: np.ndarray, columns: list[str]) -> pd.DataFrame:
+        return self.transactions.iloc[rows][columns].reset_index(drop=True)
+
+    def aggregate(self, rows: np.ndarray, group_by: str | None = None) -> pd.DataFrame:
+        """Count, amount and units sums and first/last date of the rows, optionally grouped."""
+        text_columns = ["date", "isin", "scheme", *POSTING_COLUMNS]
+        txns = self.select(rows, [*text_columns, "amount", "units"])
+        txns = txns.astype({column: "object" for column in text_columns})
+        if group_by == "year":
+            txns["year"] = txns["date"].str[:4]
+
+        aggregations = {
+            "count": ("date", "size"),
+            "amount": ("amount", "sum"),
+            "units": ("units", "sum"),
+            "first_date": ("date", "min"),
+            "last_date": ("date", "max"),
+        }
+        if group_by:
+            return txns.groupby(group_by, dropna=False).agg(**aggregations).reset_index()
+        return txns.groupby(np.zeros(len(txns), dtype=int)).agg(**aggregations).reset_index(
+            drop=True
+        )
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import brentq
+
+DAYS_PER_YEAR = 365.0
+
+# isin and scheme of the whole-portfolio row next to the per-scheme XIRR rows
+PORTFOLIO_ISIN = "PORTFOLIO"
+PORTFOLIO_SCHEME = "Total portfolio"
+
+# absolute step size at which Newton's method stops (scipy.optimize.newton's default)
+NEWTON_TOLERANCE = 1.48e-8
+NEWTON_MAX_ITER = 50
+
+# Candidate rates scanned for a sign change of xnpv when Newton does not converge
+BRACKET_RATES = np.array(
+    [-0.9999, -0.99, -0.9, -0.75, -0.5, -0.25, -0.1, 0.0, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 100.0]
+)
+
+
+def to_cashflow_arrays(transactions) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert transaction records to the arrays consumed by `xirr`.
+
+    Args:
+        transactions: list of dicts or DataFrame with "amount" and "date" (YYYY-MM-DD)
+
+    Returns:
+        (amounts, day_offsets) where day_offsets are days since the earliest cashflow
+    """
+    df = pd.DataFrame(transactions, columns=["amount", "date"])
+    amounts = df["amount"].to_numpy(dtype="float64")
+    days = pd.to_datetime(df["date"], format="%Y-%m-%d").to_numpy(dtype="datetime64[D]")
+    day_offsets = (days - days.min()).astype("float64")
+    return amounts, day_offsets
+
+
+def xnpv(rate: float, amounts: np.ndarray, years: np.ndarray) -> float:
+    return float(np.sum(amounts * (1.0 + rate) ** -years))
+
+
+def xnpv_prime(rate: float, amounts: np.ndarray, years: np.ndarray) -> float:
+    return float(np.sum(-years * amounts * (1.0 + rate) ** (-years - 1.0)))
+
+
+def _newton(amounts: np.ndarray, years: np.ndarray, guess: float) -> float | None:
+    # xnpv and its derivative share the discount factors, so each step computes them once
+    weighted = years * amounts
+    rate = guess
+    for _ in range(NEWTON_MAX_ITER):
+        discount = (1.0 + rate) ** -years
+        slope = -(weighted @ discount) / (1.0 + rate)
+        if slope == 0 or not np.isfinite(slope):
+            return None
+        step = (amounts @ discount) / slope
+        rate -= step
+        if abs(step) <= NEWTON_TOLERANCE:
+            return rate
+    return None
+
+
+def _bracket(amounts: np.ndarray, years: np.ndarray):
+    # rows: candidate rates, columns: cashflows
+    values = np.sum(amounts * (1.0 + BRACKET_RATES[:, None]) ** -years, axis=1)
+    signs = np.sign(values)
+    changes = np.flatnonzero(signs[:-1] * signs[1:] < 0)
+    if not changes.size:
+        return None
+    # prefer the bracket nearest to 0%, the economically meaningful root
+    idx = changes[np.argmin(np.abs(BRACKET_RATES[changes]))]
+    return BRACKET_RATES[idx], BRACKET_RATES[idx + 1]
+
+
+def xirr(amounts, day_offsets, guess: float = 0.1) -> float:
+    """
+    Solve for the annualised rate at which the cashflows' net present value is zero.
+
+    Newton's method with the closed-form derivative is tried first from `guess`;
+    if it diverges, Brent's method is used on a bracketed sign change.
+
+    Args:
+        amounts: cashflow amounts (negative for investments, positive for redemptions)
+        day_offsets: days of each cashflow since a common base date
+        guess: starting rate, e.g. the previous period's XIRR when solving a series
+
+    Returns:
+        float: XIRR as a decimal (e.g., 0.124 means 12.4%)
+    """
+    amounts = np.asarray(amounts, dtype="float64")
+    years = np.asarray(day_offsets, dtype="float64") / DAYS_PER_YEAR
+
+    if amounts.size < 2:
+        raise ValueError("At least two transactions are required to compute XIRR.")
+    if not np.isfinite(amounts).all():
+        raise ValueError("XIRR cashflow amounts must be finite (got NaN or infinite values).")
+    if not ((amounts > 0).any() and (amounts < 0).any()):
+        raise ValueError("XIRR needs at least one positive and one negative cashflow.")
+
+    years = years - years.min()
+
+    with np.errstate(all="ignore"):
+        rate = _newton(amounts, years, guess)
+        if rate is not None and np.isfinite(rate) and rate > -1.0:
+            return float(rate)
+
+        bracket = _bracket(amounts, years)
+        if bracket is None:
+            raise ValueError("XIRR calculation failed to converge.")
+        return float(brentq(xnpv, *bracket, args=(amounts, years)))
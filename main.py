@@ -1,20 +1,20 @@
-from dotenv import load_dotenv
-from fastapi import FastAPI
-from langchain.cache import SQLiteCache
-from langchain.globals import set_llm_cache
+from utils.startup_timing import timed
 
-from api.routes import router as chat_router
+# heavy components are built lazily by config.app_context; see GET /api/admin/startup
+with timed("app.import"):
+    from dotenv import load_dotenv
+    from fastapi import FastAPI
+
+    from api.routes import router as chat_router
+    from config.app_context import lifespan
 
 load_dotenv()
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Register chat routes
 app.include_router(chat_router)
 
 
-set_llm_cache(SQLiteCache(database_path="./data/langgraph_cache.db"))
-
-
 @app.get("/")
 def root():
     return {"message": "Welcome to the AI Agent API"}
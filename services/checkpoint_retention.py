@@ -0,0 +1,364 @@
+"""
+Retention for the checkpoint database: keep the latest checkpoints per thread, expire
+idle sessions and give freed pages back to the filesystem.
+
+    poetry run python -m services.checkpoint_retention report
+    poetry run python -m services.checkpoint_retention run
+    poetry run python -m services.checkpoint_retention convert
+
+`convert` is a one-time full VACUUM that switches a database created without
+incremental auto_vacuum (e.g. before retention existed) over to it; until then runs
+skip the vacuum step. It rewrites the whole file, so run it with the API stopped.
+
+The report lists session ids, which are the only credential the chat API checks, so
+it is only available here and never over HTTP.
+"""
+
+import argparse
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+
+from config.constants import (
+    CHECKPOINT_KEEP_LAST,
+    INCREMENTAL_VACUUM_PAGES,
+    RETENTION_LOCK_PATH,
+    SESSION_TTL_SECONDS,
+    SQLITE_DB_PATH,
+)
+from services.parse_cache import get_parse_cache
+from services.portfolio_store import get_portfolio_store
+from services.tool_cache import get_tool_cache
+from utils.checkpointer import MESSAGE_IDS_KEY, MESSAGE_RANGE_KEY, MESSAGES_CHANNEL
+from utils.db_utils import connect_sqlite
+from utils.serde import get_checkpoint_serde
+
+logger = logging.getLogger(__name__)
+
+# PRAGMA auto_vacuum value of INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+# uuid6 timestamps count 100ns intervals since the Gregorian calendar epoch (1582-10-15)
+UUID6_UNIX_EPOCH = 0x01B21DD213814000
+
+# a put stores new messages before the checkpoint that refers to them, so only threads
+# idle for a while are garbage collected
+MESSAGE_GC_GRACE_SECONDS = 300
+
+PRUNE_CHECKPOINTS_SQL = """
+    DELETE FROM checkpoints WHERE rowid IN (
+        SELECT rowid FROM (
+            SELECT rowid, ROW_NUMBER() OVER (
+                PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+            ) AS recency
+            FROM checkpoints
+        )
+        WHERE recency > ?
+    )
+"""
+PRUNE_WRITES_SQL = """
+    DELETE FROM writes WHERE NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = writes.thread_id
+            AND c.checkpoint_ns = writes.checkpoint_ns
+            AND c.checkpoint_id = writes.checkpoint_id
+    )
+"""
+LAST_CHECKPOINT_SQL = "SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id"
+THREAD_CHECKPOINTS_SQL = "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ?"
+THREAD_MESSAGES_SQL = "SELECT seq, message_id FROM checkpoint_messages WHERE thread_id = ?"
+# per thread, the latest checkpoint when its messages were last collected: messages only
+# become unreferenced when checkpoints are pruned, which needs newer checkpoints first
+CREATE_COLLECTED_SQL = """
+    CREATE TABLE IF NOT EXISTS checkpoint_messages_collected (
+        thread_id TEXT PRIMARY KEY,
+        checkpoint_id TEXT
+    )
+"""
+COLLECTED_SQL = "SELECT thread_id, checkpoint_id FROM checkpoint_messages_collected"
+MARK_COLLECTED_SQL = (
+    "INSERT OR REPLACE INTO checkpoint_messages_collected (thread_id, checkpoint_id) "
+    "VALUES (?, ?)"
+)
+DELETE_STALE_COLLECTED_SQL = """
+    DELETE FROM checkpoint_messages_collected
+    WHERE thread_id NOT IN (SELECT thread_id FROM checkpoints)
+"""
+DELETE_MESSAGE_SQL = "DELETE FROM checkpoint_messages WHERE thread_id = ? AND seq = ?"
+DELETE_THREAD_SQL = (
+    "DELETE FROM checkpoints WHERE thread_id = ?",
+    "DELETE FROM writes WHERE thread_id = ?",
+    "DELETE FROM checkpoint_messages WHERE thread_id = ?",
+)
+STORAGE_SQL = {
+    "checkpoints": "SELECT thread_id, COUNT(*), SUM(LENGTH(checkpoint) + LENGTH(metadata)) "
+    "FROM checkpoints GROUP BY thread_id",
+    "writes": "SELECT thread_id, COUNT(*), SUM(LENGTH(value)) FROM writes GROUP BY thread_id",
+    "messages": "SELECT thread_id, COUNT(*), SUM(LENGTH(value)) "
+    "FROM checkpoint_messages GROUP BY thread_id",
+}
+
+
+def checkpoint_time(checkpoint_id: str) -> float | None:
+    """Unix time encoded in a LangGraph (uuid6) checkpoint id."""
+    try:
+        value = uuid.UUID(checkpoint_id)
+    except ValueError:
+        return None
+    if value.version != 6:
+        return None
+    timestamp = ((value.int >> 80) << 12) | ((value.int >> 64) & 0x0FFF)
+    return (timestamp - UUID6_UNIX_EPOCH) / 1e7
+
+
+class CheckpointRetention:
+    """
+    Bounds the size of the checkpoint database.
+
+    A run keeps the latest `keep_last` checkpoints of each thread (and their pending
+    writes), deletes sessions idle for longer than `ttl_seconds` together with their
+    stored portfolio and cached parses, drops chat messages no remaining checkpoint
+    refers to, and releases up to `vacuum_pages` free pages with an incremental vacuum.
+    """
+
+    def __init__(
+        self,
+        path: str = SQLITE_DB_PATH,
+        keep_last: int = CHECKPOINT_KEEP_LAST,
+        ttl_seconds: int = SESSION_TTL_SECONDS,
+        vacuum_pages: int = INCREMENTAL_VACUUM_PAGES,
+        serde=None,
+    ):
+        self.path = path
+        self.keep_last = keep_last
+        self.ttl_seconds = ttl_seconds
+        self.vacuum_pages = vacuum_pages
+        self.serde = serde or get_checkpoint_serde()
+
+    @staticmethod
+    def _has_table(conn: sqlite3.Connection, name: str) -> bool:
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone()
+        return row is not None
+
+    def _last_active(self, conn: sqlite3.Connection) -> dict[str, float | None]:
+        return {
+            thread_id: checkpoint_time(checkpoint_id)
+            for thread_id, checkpoint_id in conn.execute(LAST_CHECKPOINT_SQL)
+        }
+
+    def expire_idle_sessions(self, conn: sqlite3.Connection) -> list[str]:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            thread_id
+            for thread_id, last_active in self._last_active(conn).items()
+            if last_active is not None and last_active < cutoff
+        ]
+        has_messages = self._has_table(conn, "checkpoint_messages")
+        with conn:
+            for thread_id in expired:
+                for sql in DELETE_THREAD_SQL[: 3 if has_messages else 2]:
+                    conn.execute(sql, (thread_id,))
+
+        for thread_id in expired:
+            get_tool_cache().invalidate(thread_id)
+            try:
+                get_portfolio_store().delete(thread_id)
+                get_parse_cache().purge_session(thread_id)
+            except ValueError:
+                # not a session id the API accepts, so it never had stored uploads
+                logger.warning("Skipping upload cleanup for thread %r", thread_id)
+        return expired
+
+    def prune_checkpoints(self, conn: sqlite3.Connection) -> tuple[int, int]:
+        with conn:
+            checkpoints = conn.execute(PRUNE_CHECKPOINTS_SQL, (self.keep_last,)).rowcount
+            writes = conn.execute(PRUNE_WRITES_SQL).rowcount
+        return checkpoints, writes
+
+    def _referenced(self, conn: sqlite3.Connection, thread_id: str):
+        seq_ranges, message_ids = [], set()
+        for type_, blob in conn.execute(THREAD_CHECKPOINTS_SQL, (thread_id,)).fetchall():
+            refs = self.serde.loads_typed((type_, blob))["channel_values"].get(MESSAGES_CHANNEL)
+            if not isinstance(refs, dict):
+                continue
+            if MESSAGE_RANGE_KEY in refs:
+                seq_ranges.append(refs[MESSAGE_RANGE_KEY])
+            message_ids.update(refs.get(MESSAGE_IDS_KEY, ()))
+        return seq_ranges, message_ids
+
+    def collect_messages(self, conn: sqlite3.Connection) -> int:
+        """
+        Delete stored messages that no remaining checkpoint of their thread refers to.
+
+        Only threads with checkpoints written since their last collection are read, so a
+        run costs what changed rather than the size of the whole database.
+        """
+        if not self._has_table(conn, "checkpoint_messages"):
+            return 0
+        with conn:
+            conn.execute(CREATE_COLLECTED_SQL)
+            conn.execute(DELETE_STALE_COLLECTED_SQL)
+
+        cutoff = time.time() - MESSAGE_GC_GRACE_SECONDS
+        last_checkpoint = dict(conn.execute(LAST_CHECKPOINT_SQL).fetchall())
+        # "" for never collected: it differs from every checkpoint id and from None
+        collected = dict(conn.execute(COLLECTED_SQL).fetchall())
+        threads = [
+            thread_id
+            for (thread_id,) in conn.execute("SELECT DISTINCT thread_id FROM checkpoint_messages")
+            if collected.get(thread_id, "") != last_checkpoint.get(thread_id)
+            and (checkpoint_time(last_checkpoint.get(thread_id) or "") or 0) < cutoff
+        ]
+        unreferenced = []
+        for thread_id in threads:
+            seq_ranges, message_ids = self._referenced(conn, thread_id)
+            unreferenced += [
+                (thread_id, seq)
+                for seq, message_id in conn.execute(THREAD_MESSAGES_SQL, (thread_id,)).fetchall()
+                if message_id not in message_ids
+                and not any(first <= seq <= last for first, last in seq_ranges)
+            ]
+        with conn:
+            conn.executemany(DELETE_MESSAGE_SQL, unreferenced)
+            conn.executemany(
+                MARK_COLLECTED_SQL,
+                [(thread_id, last_checkpoint.get(thread_id)) for thread_id in threads],
+            )
+        return len(unreferenced)
+
+    def vacuum(self, conn: sqlite3.Connection) -> int:
+        (auto_vacuum,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+        if auto_vacuum != AUTO_VACUUM_INCREMENTAL:
+            # never a full VACUUM here: it blocks the database for the whole rewrite
+            logger.warning(
+                "%s does not use incremental auto_vacuum; freed pages stay in the file "
+                "until `python -m services.checkpoint_retention convert` is run once",
+                self.path,
+            )
+            return 0
+        (free_before,) = conn.execute("PRAGMA freelist_count").fetchone()
+        conn.execute(f"PRAGMA incremental_vacuum({self.vacuum_pages})").fetchall()
+        (free_after,) = conn.execute("PRAGMA freelist_count").fetchone()
+        return free_before - free_after
+
+    def convert(self) -> dict:
+        """Switch the database to incremental auto_vacuum with one full VACUUM."""
+        with closing(connect_sqlite(self.path)) as conn:
+            (auto_vacuum,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+            converted = auto_vacuum != AUTO_VACUUM_INCREMENTAL
+            if converted:
+                logger.info("Converting %s to incremental auto_vacuum", self.path)
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.execute("VACUUM")
+        return {"converted": converted}
+
+    def run(self) -> dict:
+        with closing(connect_sqlite(self.path)) as conn:
+            if not self._has_table(conn, "checkpoints"):
+                return {}
+            expired = self.expire_idle_sessions(conn)
+            checkpoints, writes = self.prune_checkpoints(conn)
+            messages = self.collect_messages(conn)
+            pages = self.vacuum(conn)
+
+        stats = {
+            "expired_sessions": len(expired),
+            "deleted_checkpoints": checkpoints,
+            "deleted_writes": writes,
+            "deleted_messages": messages,
+            "freed_pages": pages,
+        }
+        logger.info("Checkpoint retention: %s", stats)
+        return stats
+
+    async def run_periodically(
+        self, interval_seconds: float, lock_path: str = RETENTION_LOCK_PATH
+    ):
+        """
+        Run retention every `interval_seconds` in the one process holding `lock_path`.
+
+        Every API worker calls this; the others keep trying the lock each interval, so
+        one of them takes over when the holder exits (the OS releases its lock).
+        """
+        lock = None
+        try:
+            while True:
+                lock = lock or _try_lock(lock_path)
+                if lock is not None:
+                    try:
+                        await asyncio.to_thread(self.run)
+                    except Exception:
+                        logger.exception("Checkpoint retention run failed")
+                await asyncio.sleep(interval_seconds)
+        finally:
+            if lock is not None:
+                lock.close()
+
+    def storage_report(self) -> dict:
+        """Database size and per-session row counts and bytes, largest sessions first."""
+        with closing(connect_sqlite(self.path)) as conn:
+            (page_size,) = conn.execute("PRAGMA page_size").fetchone()
+            (page_count,) = conn.execute("PRAGMA page_count").fetchone()
+            (free_pages,) = conn.execute("PRAGMA freelist_count").fetchone()
+
+            sessions = {}
+            for table, sql in STORAGE_SQL.items():
+                source = "checkpoint_messages" if table == "messages" else table
+                if not self._has_table(conn, source):
+                    continue
+                for thread_id, rows, size in conn.execute(sql):
+                    session = sessions.setdefault(thread_id, {"session_id": thread_id})
+                    session[table] = rows
+                    session[f"{table}_bytes"] = size or 0
+            last_active = self._last_active(conn) if sessions else {}
+
+        for thread_id, session in sessions.items():
+            session["total_bytes"] = sum(
+                session.get(f"{table}_bytes", 0) for table in STORAGE_SQL
+            )
+            session["last_active"] = last_active.get(thread_id)
+
+        return {
+            "db_bytes": page_size * page_count,
+            "free_bytes": page_size * free_pages,
+            "sessions": sorted(sessions.values(), key=lambda s: s["total_bytes"], reverse=True),
+        }
+
+
+def _try_lock(path: str):
+    """Open `path` holding an exclusive lock, or return None if another process holds it."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    lock = open(path, "a")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["report", "run", "convert"])
+    parser.add_argument("--db", default=SQLITE_DB_PATH)
+    args = parser.parse_args()
+
+    retention = CheckpointRetention(args.db)
+    commands = {
+        "report": retention.storage_report,
+        "run": retention.run,
+        "convert": retention.convert,
+    }
+    print(json.dumps(commands[args.command](), indent=2))
+
+
+if __name__ == "__main__":
+    main()
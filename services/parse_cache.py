@@ -0,0 +1,110 @@
+import hashlib
+import logging
+import os
+import pickle
+import uuid
+from functools import cache
+
+import pandas as pd
+
+from config.constants import PARSE_CACHE_DIR, PARSE_CACHE_MAX_BYTES
+from utils.session_ids import validate_session_id
+
+logger = logging.getLogger(__name__)
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed CAS transactions keyed by a hash of the PDF bytes and password.
+
+    Only the casparser output (signed transactions) is cached. Holdings are valued again
+    on every hit, so NAV reference data changes are always reflected without explicit
+    invalidation. Entries are evicted least-recently-used once the cache exceeds
+    `max_bytes`; file mtimes track recency so worker processes share one LRU order.
+    The keys each session read or wrote are listed in `<session_id>.keys`, so the
+    decrypted statements can be purged when the session expires.
+    """
+
+    def __init__(self, root: str = PARSE_CACHE_DIR, max_bytes: int = PARSE_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(file_bytes: bytes, password: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(password.encode())
+        digest.update(b"\0")
+        digest.update(file_bytes)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.pkl")
+
+    def _keys_path(self, session_id: str) -> str:
+        return os.path.join(self.root, f"{validate_session_id(session_id)}.keys")
+
+    def _remember(self, session_id: str, key: str):
+        with open(self._keys_path(session_id), "a") as f:
+            f.write(f"{key}\n")
+
+    def get(self, key: str, session_id: str) -> pd.DataFrame | None:
+        path = self._path(key)
+        try:
+            txns_df = pd.read_pickle(path)
+            os.utime(path)
+        except (FileNotFoundError, EOFError):
+            return None
+        except (pickle.UnpicklingError, ValueError):
+            # a corrupt entry is dropped, so the upload parses again and replaces it
+            logger.warning("Dropping unreadable parse cache entry %s", key)
+            self._remove(path)
+            return None
+        self._remember(session_id, key)
+        return txns_df
+
+    def put(self, key: str, txns_df: pd.DataFrame, session_id: str):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, f".{uuid.uuid4().hex}.tmp")
+        txns_df.to_pickle(tmp_path)
+        os.replace(tmp_path, self._path(key))
+        self._remember(session_id, key)
+        self._evict()
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def purge_session(self, session_id: str) -> int:
+        """Remove the entries the session's uploads read or wrote; returns how many."""
+        keys_path = self._keys_path(session_id)
+        try:
+            with open(keys_path) as f:
+                keys = set(f.read().split())
+        except FileNotFoundError:
+            return 0
+        for key in keys:
+            self._remove(self._path(key))
+        self._remove(keys_path)
+        return len(keys)
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+
+@cache
+def get_parse_cache(root: str = PARSE_CACHE_DIR) -> ParseCache:
+    return ParseCache(root)
@@ -0,0 +1,129 @@
+import json
+import os
+import re
+import shutil
+import uuid
+from functools import cache
+
+import numpy as np
+import pandas as pd
+
+from config.constants import PORTFOLIO_STORE_DIR
+from utils.session_ids import validate_session_id
+
+META_FILE = "meta.json"
+VERSION_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+class PortfolioStore:
+    """
+    Disk-backed, columnar store of a session's parsed portfolio.
+
+    Each upload is written once as a version directory of `.npy` column files:
+    numeric columns as float64/int64 arrays and text columns as int32 category codes
+    with their categories kept in `meta.json`. Reads memory-map the column files, so
+    graph state only needs to carry the returned handle ("<session_id>/<version>").
+    """
+
+    def __init__(self, root: str = PORTFOLIO_STORE_DIR):
+        self.root = root
+
+    def _session_dir(self, session_id: str) -> str:
+        return os.path.join(self.root, validate_session_id(session_id))
+
+    def _version_dir(self, handle: str) -> str:
+        session_id, _, version = handle.partition("/")
+        if not VERSION_PATTERN.fullmatch(version):
+            raise ValueError(f"Invalid portfolio handle: {handle!r}")
+        return os.path.join(self._session_dir(session_id), version)
+
+    def _write_dataset(self, dataset_dir: str, df: pd.DataFrame) -> list[dict]:
+        os.makedirs(dataset_dir)
+        columns = []
+        for idx, (name, series) in enumerate(df.items()):
+            path = os.path.join(dataset_dir, f"{idx}.npy")
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                np.save(path, series.to_numpy())
+                columns.append({"name": name, "kind": "numeric"})
+            else:
+                categorical = pd.Categorical(series.astype("object").where(series.notna(), None))
+                np.save(path, categorical.codes.astype(np.int32))
+                columns.append(
+                    {
+                        "name": name,
+                        "kind": "category",
+                        "categories": [str(c) for c in categorical.categories],
+                    }
+                )
+        return columns
+
+    def write(self, session_id: str, **datasets: pd.DataFrame) -> str:
+        """
+        Persist a new version of the session's datasets.
+
+        Older versions are left in place (graph state may still point at one) until
+        `prune` is called with the new handle.
+
+        Returns:
+            str: handle to pass to `read`
+        """
+        session_dir = self._session_dir(session_id)
+        version = uuid.uuid4().hex
+        tmp_dir = os.path.join(session_dir, f".{version}.tmp")
+
+        meta = {
+            name: {"rows": len(df), "columns": self._write_dataset(os.path.join(tmp_dir, name), df)}
+            for name, df in datasets.items()
+        }
+        with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+            json.dump(meta, f)
+        os.rename(tmp_dir, os.path.join(session_dir, version))
+        return f"{session_id}/{version}"
+
+    def prune(self, handle: str) -> list[str]:
+        """
+        Remove the finished versions of the handle's session written before it.
+
+        In-progress writes (dot-prefixed tmp directories) and newer versions, e.g. of an
+        overlapping upload, are kept. Returns the removed versions.
+        """
+        version_dir = self._version_dir(handle)
+        session_dir = os.path.dirname(version_dir)
+        written_at = os.path.getmtime(os.path.join(version_dir, META_FILE))
+
+        removed = []
+        for entry in os.listdir(session_dir):
+            meta_path = os.path.join(session_dir, entry, META_FILE)
+            if not VERSION_PATTERN.fullmatch(entry) or entry == os.path.basename(version_dir):
+                continue
+            try:
+                older = os.path.getmtime(meta_path) < written_at
+            except OSError:
+                continue
+            if older:
+                shutil.rmtree(os.path.join(session_dir, entry), ignore_errors=True)
+                removed.append(entry)
+        return removed
+
+    def read(self, handle: str, name: str) -> pd.DataFrame:
+        """Load a dataset with its column files memory-mapped read-only."""
+        version_dir = self._version_dir(handle)
+        with open(os.path.join(version_dir, META_FILE)) as f:
+            meta = json.load(f)[name]
+
+        columns = {}
+        for idx, column in enumerate(meta["columns"]):
+            values = np.load(os.path.join(version_dir, name, f"{idx}.npy"), mmap_mode="r")
+            if column["kind"] == "category":
+                values = pd.Categorical.from_codes(values, column["categories"])
+            columns[column["name"]] = values
+        return pd.DataFrame(columns, index=pd.RangeIndex(meta["rows"]), copy=False)
+
+    def delete(self, session_id: str):
+        """Remove every stored version of the session's datasets."""
+        shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+
+
+@cache
+def get_portfolio_store(root: str = PORTFOLIO_STORE_DIR) -> PortfolioStore:
+    return PortfolioStore(root)
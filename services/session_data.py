@@ -0,0 +1,22 @@
+from functools import lru_cache
+
+import pandas as pd
+
+from config.constants import SESSION_DATA_CACHE_SIZE
+from services.portfolio_store import get_portfolio_store
+
+
+@lru_cache(maxsize=SESSION_DATA_CACHE_SIZE)
+def _open_dataset(handle: str, name: str) -> pd.DataFrame:
+    return get_portfolio_store().read(handle, name)
+
+
+def get_session_dataset(handle: str, name: str) -> pd.DataFrame:
+    """
+    Read-only columnar view of a stored session dataset.
+
+    The columns stay memory-mapped from the store and are opened once per (immutable)
+    handle; each caller gets a shallow copy, so adding columns does not touch the cached
+    frame while writing to the stored values raises.
+    """
+    return _open_dataset(handle, name).copy(deep=False)
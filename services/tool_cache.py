@@ -0,0 +1,78 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import cache
+
+from config.constants import TOOL_CACHE_MAX_ENTRIES
+
+
+class ToolResultCache:
+    """
+    In-memory LRU cache of tool results per chat session.
+
+    Tools are pure functions of their arguments, and the `var_*` references in tool
+    arguments always resolve to the immutable portfolio version named by the store
+    handle. Hashing the handle together with the literal arguments therefore identifies
+    the dereferenced inputs without reading or hashing the data itself; a re-upload
+    writes a new version and `invalidate` drops the session's old entries.
+    """
+
+    def __init__(self, max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, object] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(portfolio: str, tool_name: str, args: dict) -> tuple:
+        session_id = portfolio.split("/", 1)[0]
+        canonical = json.dumps(
+            {"portfolio": portfolio, "args": args},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return session_id, tool_name, hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, key: tuple):
+        """Return `(hit, result)`; `result` is None on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: tuple, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+@cache
+def get_tool_cache() -> ToolResultCache:
+    return ToolResultCache()
@@ -0,0 +1,24 @@
+from functools import lru_cache
+
+from config.constants import TRANSACTION_INDEX_CACHE_SIZE
+from domain.transaction_index import TransactionIndex
+from services.portfolio_store import get_portfolio_store
+from services.session_data import get_session_dataset
+
+POSTINGS_DATASET = "transaction_postings"
+
+
+@lru_cache(maxsize=TRANSACTION_INDEX_CACHE_SIZE)
+def get_transaction_index(handle: str) -> TransactionIndex:
+    """
+    Open the transaction index stored with a portfolio version (memory-mapped).
+
+    Handles name immutable versions, so the index is cached per handle. Portfolios
+    uploaded before the index existed are indexed in memory on first use.
+    """
+    transactions = get_session_dataset(handle, "transactions")
+    try:
+        postings = get_portfolio_store().read(handle, POSTINGS_DATASET)
+    except KeyError:
+        return TransactionIndex.from_frame(transactions)
+    return TransactionIndex(transactions, postings)
@@ -0,0 +1,135 @@
+import asyncio
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from config.constants import MAX_UPLOAD_JOBS, UPLOAD_PARSER_WORKERS
+from domain.cas_parser import CasParser
+from domain.transaction_index import build_postings, prepare_transactions
+from services.parse_cache import get_parse_cache
+from services.portfolio_store import get_portfolio_store
+from services.transaction_index import POSTINGS_DATASET
+
+JOB_QUEUED = "queued"
+JOB_PARSING = "parsing"
+JOB_SUMMARIZING = "summarizing"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+FINISHED_STATES = {JOB_DONE, JOB_FAILED}
+
+
+def parse_cas_to_store(session_id: str, file_bytes: bytes, password: str) -> str:
+    """
+    Parse a CAS PDF and persist the result in the session's PortfolioStore.
+
+    Runs in a worker process, so only the small store handle crosses the process boundary.
+    A repeat upload of the same file and password skips casparser and only re-values
+    the holdings. The transactions are stored sorted and tagged for the transaction
+    index, together with its posting lists.
+    """
+    cas_parser = CasParser(BytesIO(file_bytes), password)
+
+    parse_cache = get_parse_cache()
+    cache_key = parse_cache.key(file_bytes, password)
+    if (txns_df := parse_cache.get(cache_key, session_id)) is None:
+        txns_df = cas_parser.read_transactions()
+        parse_cache.put(cache_key, txns_df, session_id)
+
+    transactions, curr_holdings, past_holdings = cas_parser.value_holdings(txns_df)
+    transactions = prepare_transactions(transactions)
+    return get_portfolio_store().write(
+        session_id,
+        transactions=transactions,
+        curr_holdings=curr_holdings,
+        past_holdings=past_holdings,
+        **{POSTINGS_DATASET: build_postings(transactions)},
+    )
+
+
+class UploadJobManager:
+    """
+    Runs CAS uploads as background jobs.
+
+    Parsing happens in a bounded process pool so it scales with cores and never holds the
+    event loop; the LLM summary step then runs on the loop. Job state lives in this
+    process, so status must be queried on the worker that accepted the upload.
+    """
+
+    def __init__(self, cas_etl_workflow, max_workers: int = UPLOAD_PARSER_WORKERS):
+        self.cas_etl_workflow = cas_etl_workflow
+        # spawn: the API process runs threads (aiosqlite, to_thread) that fork would copy badly
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._jobs: dict[str, dict] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._changed: dict[str, asyncio.Condition] = {}
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in FINISHED_STATES]
+        for job_id in finished[: max(0, len(self._jobs) - MAX_UPLOAD_JOBS)]:
+            del self._jobs[job_id]
+            self._changed.pop(job_id, None)
+
+    async def _update(self, job_id: str, **fields):
+        self._jobs[job_id].update(fields, updated_at=time.time())
+        async with self._changed[job_id]:
+            self._changed[job_id].notify_all()
+
+    async def _run(self, job_id: str, file_bytes: bytes, password: str):
+        session_id = self._jobs[job_id]["session_id"]
+        loop = asyncio.get_running_loop()
+        try:
+            await self._update(job_id, status=JOB_PARSING)
+            handle = await loop.run_in_executor(
+                self._pool, parse_cas_to_store, session_id, file_bytes, password
+            )
+            await self._update(job_id, status=JOB_SUMMARIZING)
+            reply = await self.cas_etl_workflow.asummarize(session_id, {"portfolio": handle})
+            await self._update(job_id, status=JOB_DONE, result={"reply": reply})
+        except Exception as e:
+            await self._update(job_id, status=JOB_FAILED, error=str(e) or type(e).__name__)
+        finally:
+            self._tasks.pop(job_id, None)
+
+    def submit(self, session_id: str, file_bytes: bytes, password: str) -> dict:
+        self._evict_finished()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._jobs[job_id] = {
+            "job_id": job_id,
+            "session_id": session_id,
+            "status": JOB_QUEUED,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self._changed[job_id] = asyncio.Condition()
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id, file_bytes, password))
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict | None:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def watch(self, job_id: str):
+        """Yield a snapshot of the job now and after every change until it finishes."""
+        condition = self._changed[job_id]
+        while True:
+            job = self.get(job_id)
+            yield job
+            if job["status"] in FINISHED_STATES:
+                return
+            async with condition:
+                await condition.wait_for(
+                    lambda: self._jobs[job_id]["updated_at"] != job["updated_at"]
+                )
+
+    def shutdown(self):
+        for task in self._tasks.values():
+            task.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
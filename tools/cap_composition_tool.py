@@ -1,8 +1,8 @@
 import pandas as pd
 from langchain_core.tools import tool
 
-scheme_data = pd.read_csv("reference_data/scheme_data.csv")
-scheme_cat_asset_cls_df = pd.read_csv("reference_data/scheme_cat_asset_cls.csv")
+from domain.reference_data import get_scheme_category_index
+from tools.data_refs import CurrHoldings
 
 
 def get_asset_class_composition(curr_holdings: list):
@@ -16,49 +16,23 @@ def get_asset_class_composition(curr_holdings: list):
         DataFrame with added 'scheme_category' and 'asset_class' columns
     """
 
-    # Create a copy to avoid modifying the original dataframe
-
     result_df = pd.DataFrame(curr_holdings)
 
-    # Function to match ISIN and get scheme category
-    def match_category(row):
-        isin = row["isin"]
-        # Find matching scheme in scheme_data
-        match = scheme_data[
-            scheme_data["ISIN Div Payout/ ISIN GrowthISIN Div Reinvestment"].str.contains(
-                isin, na=False
-            )
-        ]
-
-        if not match.empty:
-            return match["Scheme Category"].item()
-        return None
-
-    # Add scheme category column
-    result_df["scheme_category"] = result_df.apply(match_category, axis=1)
-
-    # Merge with asset class mapping
-    result_df = result_df.merge(
-        scheme_cat_asset_cls_df,
-        left_on="scheme_category",
-        right_on="scheme_cat",
-        how="left",
-    )
-
-    # Drop the redundant scheme_cat column from the merge
-    if "scheme_cat" in result_df.columns:
-        result_df = result_df.drop("scheme_cat", axis=1)
+    # Single vectorized join against the prebuilt ISIN -> category/asset class table
+    categories = get_scheme_category_index().lookup(result_df["isin"])
+    result_df["scheme_category"] = categories["scheme_category"]
+    result_df["asset_class"] = categories["asset_class"]
 
     return result_df
 
 
 @tool
-def get_asset_class_summary(curr_holdings: list) -> dict:
+def get_asset_class_summary(curr_holdings: CurrHoldings) -> dict:
     """
     Aggregate holdings by asset class and return summary with market value and percentage
 
     Args:
-        curr_holdings: DataFrame with 'isin', 'market_value' columns and asset class info
+        curr_holdings: var_curr_holdings
 
     Returns:
         List of dictionaries with asset_class, market_value, and percentage
@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from typing import Annotated
+
+import pandas as pd
+from pydantic import SkipValidation, WithJsonSchema
+
+from services.session_data import get_session_dataset
+
+# references the LLM passes in tool calls, by the stored dataset they name
+SESSION_DATASETS = {
+    "var_transactions": "transactions",
+    "var_curr_holdings": "curr_holdings",
+    "var_past_holdings": "past_holdings",
+}
+DATASET_REFS = {dataset: ref for ref, dataset in SESSION_DATASETS.items()}
+
+
+@dataclass(frozen=True)
+class DataRef:
+    """Marks a tool argument that takes session datasets by their `var_*` reference."""
+
+    datasets: tuple[str, ...]
+    # also accept literal records from the LLM
+    inline: bool = False
+
+    @property
+    def refs(self) -> list[str]:
+        return [DATASET_REFS[dataset] for dataset in self.datasets]
+
+
+def session_data(*datasets: str, description: str, inline: bool = False):
+    """
+    Annotation for a tool argument bound to a session dataset.
+
+    The LLM sees a string enum of the `var_*` references; the tool node replaces the
+    reference with the dataset's read-only columnar view. Validation of the argument is
+    skipped, so the view goes through `tool.invoke` as is instead of being walked and
+    copied row by row.
+    """
+    ref = DataRef(datasets, inline)
+    schema = {"type": "string", "enum": ref.refs}
+    if inline:
+        schema = {"anyOf": [schema, {"type": "array", "items": {"type": "object"}}]}
+    annotation = pd.DataFrame | list[dict] if inline else pd.DataFrame
+    return Annotated[
+        annotation, SkipValidation, WithJsonSchema({**schema, "description": description}), ref
+    ]
+
+
+Transactions = session_data(
+    "transactions",
+    description="All my transactions, including the HOLDINGS rows with current value",
+)
+CurrHoldings = session_data(
+    "curr_holdings", description="Current holdings with isin, units and market_value"
+)
+
+
+def data_args(tool) -> dict[str, DataRef]:
+    """Arguments of a tool that take session datasets."""
+    return {
+        name: metadata
+        for name, field in tool.args_schema.model_fields.items()
+        for metadata in field.metadata
+        if isinstance(metadata, DataRef)
+    }
+
+
+def bind_session_data(refs: dict[str, DataRef], args: dict, handle: str) -> dict:
+    """
+    Copy of the tool call arguments with every `var_*` reference replaced by the view
+    of its dataset in the portfolio `handle`.
+    """
+    bound = dict(args)
+    for name, ref in refs.items():
+        value = args.get(name)
+        dataset = SESSION_DATASETS.get(value) if isinstance(value, str) else None
+        if dataset in ref.datasets:
+            bound[name] = get_session_dataset(handle, dataset)
+        elif name in args and not (ref.inline and isinstance(value, list)):
+            raise ValueError(f"{name} must be one of {', '.join(ref.refs)}, got {value!r}")
+    return bound
@@ -1,35 +1,79 @@
 from tools.cap_composition_tool import get_asset_class_summary
-from tools.filter_transactions_tool import filter_transactions_by_isin
-from tools.xirr_tool import get_xirr
+from tools.scheme_returns_tool import get_scheme_wise_returns
+from tools.transaction_query_tool import query_transactions
+from tools.valuation_tool import get_portfolio_value_history
+from tools.xirr_tool import get_xirr, get_xirr_history
 
-tools = [get_xirr, filter_transactions_by_isin, get_asset_class_summary]
+tools = [
+    get_xirr,
+    query_transactions,
+    get_asset_class_summary,
+    get_scheme_wise_returns,
+    get_portfolio_value_history,
+    get_xirr_history,
+]
 
 tools_ = [
     {
         "type": "function",
         "function": {
             "name": "get_xirr",
-            "description": "Calculate the XIRR for a list of mutual fund transactions. Each cashflow must have 'amount' (float) and 'date' (YYYY-MM-DD).",
+            "description": "Calculate the XIRR for my transactions or a list of mutual fund cashflows. Each cashflow must have 'amount' (float) and 'date' (YYYY-MM-DD).",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "transactions": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "amount": {
-                                    "type": "number",
-                                    "description": "Cashflow amount. Negative for investment, positive for redemption.",
-                                },
-                                "date": {
-                                    "type": "string",
-                                    "description": "Cashflow date in YYYY-MM-DD format.",
+                        "anyOf": [
+                            {"type": "string", "enum": ["var_transactions"]},
+                            {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "amount": {"type": "number"},
+                                        "date": {"type": "string"},
+                                    },
+                                    "required": ["amount", "date"],
                                 },
                             },
-                            "required": ["amount", "date"],
-                        },
-                        "description": "List of transactions.",
+                        ],
+                        "description": "My transactions, or a list of cashflows with \"amount\" and \"date\"",
+                    }
+                },
+                "required": ["transactions"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_asset_class_summary",
+            "description": "Summarizes current holdings by asset class, returning market value and percentage share for each asset class.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "curr_holdings": {
+                        "type": "string",
+                        "enum": ["var_curr_holdings"],
+                        "description": "Current holdings with isin, units and market_value",
+                    }
+                },
+                "required": ["curr_holdings"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_scheme_wise_returns",
+            "description": "Calculates XIRR, invested amount, redeemed amount, current value and absolute gain for every scheme and for the whole portfolio in one call.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "transactions": {
+                        "type": "string",
+                        "enum": ["var_transactions"],
+                        "description": "All my transactions, including the HOLDINGS rows with current value",
                     }
                 },
                 "required": ["transactions"],
@@ -39,71 +83,84 @@ tools_ = [
     {
         "type": "function",
         "function": {
-            "name": "filter_transactions_by_isin",
-            "description": "Filters a list of transactions to only include transactions with the specified ISIN.",
+            "name": "get_portfolio_value_history",
+            "description": "Returns portfolio value, net invested amount and gain over time (monthly or daily), for the whole portfolio or a single scheme.",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "transactions": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "isin": {
-                                    "type": "string",
-                                    "description": "ISIN code of the transaction",
-                                },
-                                "amount": {
-                                    "type": "number",
-                                    "description": "Transaction amount",
-                                },
-                                "date": {
-                                    "type": "string",
-                                    "description": "Date of the transaction in YYYY-MM-DD format",
-                                },
-                                # Add any other relevant fields as per your data
-                            },
-                            "required": ["isin"],
-                        },
-                        "description": "List of cashflow transactions, each with an ISIN and other details",
+                        "type": "string",
+                        "enum": ["var_transactions"],
+                        "description": "All my transactions, including the HOLDINGS rows with current value",
+                    },
+                    "frequency": {
+                        "type": "string",
+                        "enum": ["monthly", "daily"],
+                        "description": "Spacing of the series; monthly uses month ends and today",
                     },
                     "isin": {
                         "type": "string",
-                        "description": "The ISIN to filter the transactions by",
+                        "description": "Only return the series of this scheme",
                     },
                 },
-                "required": ["transactions", "isin"],
+                "required": ["transactions"],
             },
         },
     },
     {
         "type": "function",
         "function": {
-            "name": "get_asset_class_summary",
-            "description": "Summarizes current holdings by asset class, returning market value and percentage share for each asset class.",
+            "name": "get_xirr_history",
+            "description": "Returns XIRR as of every month end, with net invested amount and value, for the whole portfolio or a single scheme.",
             "parameters": {
                 "type": "object",
                 "properties": {
-                    "curr_holdings": {
-                        "type": "array",
-                        "description": "List of current holding records, each containing at least 'isin' and 'market_value'.",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "isin": {
-                                    "type": "string",
-                                    "description": "ISIN code of the security",
-                                },
-                                "market_value": {
-                                    "type": "number",
-                                    "description": "Market value of the holding",
-                                },
-                            },
-                            "required": ["isin", "market_value"],
-                        },
-                    }
+                    "transactions": {
+                        "type": "string",
+                        "enum": ["var_transactions"],
+                        "description": "All my transactions, including the HOLDINGS rows with current value",
+                    },
+                    "isin": {
+                        "type": "string",
+                        "description": "Return the series of this scheme instead of the whole portfolio",
+                    },
                 },
-                "required": ["curr_holdings"],
+                "required": ["transactions"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "query_transactions",
+            "description": "Queries the user's transactions by ISIN, AMC, scheme category, transaction type and date range, returning matching rows or aggregates (count, amount, units, first/last date), optionally grouped.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "isin": {"type": "string", "description": "Exact ISIN"},
+                    "amc": {"type": "string", "description": "AMC name or part of it"},
+                    "scheme_category": {
+                        "type": "string",
+                        "description": "Scheme category or part of it, e.g. 'ELSS'",
+                    },
+                    "transaction_type": {
+                        "type": "string",
+                        "description": "e.g. PURCHASE, PURCHASE_SIP, REDEMPTION, SWITCH_IN",
+                    },
+                    "start_date": {"type": "string", "description": "First date, YYYY-MM-DD"},
+                    "end_date": {"type": "string", "description": "Last date, YYYY-MM-DD"},
+                    "aggregate": {
+                        "type": "boolean",
+                        "description": "Return count, sums and first/last date instead of rows",
+                    },
+                    "group_by": {
+                        "type": "string",
+                        "enum": ["isin", "scheme", "amc", "scheme_category", "type", "year"],
+                        "description": "Column to group the aggregate by",
+                    },
+                    "limit": {"type": "integer", "description": "Maximum rows to list"},
+                },
+                "required": [],
             },
         },
     },
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+from langchain_core.tools import tool
+
+from domain.xirr import PORTFOLIO_ISIN, PORTFOLIO_SCHEME, to_cashflow_arrays, xirr
+from tools.data_refs import Transactions
+
+
+def _safe_xirr(amounts, day_offsets):
+    try:
+        return round(xirr(amounts, day_offsets) * 100, 2)
+    except ValueError:
+        return None
+
+
+@tool
+def get_scheme_wise_returns(transactions: Transactions) -> list:
+    """
+    Calculate XIRR, invested amount, current value and absolute gain for every scheme
+    and for the whole portfolio in one pass.
+
+    Args:
+        transactions: var_transactions, including the "HOLDINGS" rows for current value
+
+    Returns:
+        list: One dict per ISIN plus a final "PORTFOLIO" row, each with scheme, xirr (in %),
+            invested, redeemed, current_value and absolute_gain
+    """
+    # schemes without an ISIN have no HOLDINGS row, so leave them out like the other tools
+    txns_df = pd.DataFrame(transactions).dropna(subset=["isin"])
+    amounts, day_offsets = to_cashflow_arrays(txns_df)
+
+    is_holding = (txns_df["type"] == "HOLDINGS").to_numpy()
+    flows = pd.DataFrame(
+        {
+            "isin": txns_df["isin"].to_numpy(),
+            "invested": np.where(~is_holding & (amounts < 0), -amounts, 0.0),
+            "redeemed": np.where(~is_holding & (amounts > 0), amounts, 0.0),
+            "current_value": np.where(is_holding, amounts, 0.0),
+        }
+    )
+
+    summary = flows.groupby("isin", sort=True).sum()
+    summary.loc[PORTFOLIO_ISIN] = summary.sum()
+    summary["absolute_gain"] = summary["current_value"] + summary["redeemed"] - summary["invested"]
+
+    # stored text columns are categoricals; group only the ISINs present, as plain labels
+    scheme_names = txns_df.groupby("isin", observed=True)["scheme"].first().astype(object)
+    summary["scheme"] = scheme_names.reindex(summary.index).fillna(PORTFOLIO_SCHEME)
+
+    # One XIRR solve per contiguous ISIN slice of the sorted cashflow arrays
+    isins = flows["isin"].to_numpy()
+    order = np.argsort(isins, kind="stable")
+    sorted_isins = isins[order]
+    boundaries = np.flatnonzero(sorted_isins[1:] != sorted_isins[:-1]) + 1
+    xirrs = {
+        isins[idx[0]]: _safe_xirr(amounts[idx], day_offsets[idx])
+        for idx in np.split(order, boundaries)
+    }
+    xirrs[PORTFOLIO_ISIN] = _safe_xirr(amounts, day_offsets)
+    summary["xirr"] = pd.Series(xirrs)
+
+    summary = summary.reset_index()
+    summary[["invested", "redeemed", "current_value", "absolute_gain"]] = summary[
+        ["invested", "redeemed", "current_value", "absolute_gain"]
+    ].round(2)
+    summary = summary.astype(object).where(summary.notna(), None)
+    return summary[
+        ["isin", "scheme", "xirr", "invested", "redeemed", "current_value", "absolute_gain"]
+    ].to_dict("records")
@@ -0,0 +1,65 @@
+from typing import Annotated
+
+from langchain_core.tools import InjectedToolArg, tool
+
+from config.constants import TOOL_RESULT_TOKEN_BUDGET, TRANSACTION_QUERY_MAX_ROWS
+from domain.transaction_index import GROUP_BY_COLUMNS, RESULT_COLUMNS
+from services.transaction_index import get_transaction_index
+from utils.context_encoder import count_tokens, encode_table
+
+
+def _encode(heading: str, df) -> str:
+    # the heading shares the tool result budget with the table
+    budget = TOOL_RESULT_TOKEN_BUDGET - count_tokens(heading) - 1
+    return f"{heading}\n{encode_table(df, budget)}"
+
+
+@tool
+def query_transactions(
+    isin: str | None = None,
+    amc: str | None = None,
+    scheme_category: str | None = None,
+    transaction_type: str | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    aggregate: bool = False,
+    group_by: str | None = None,
+    limit: int = 50,
+    # store handle of the session's portfolio, injected by the agent's tool node
+    portfolio: Annotated[str, InjectedToolArg] = "",
+) -> str:
+    """
+    Query my transactions by ISIN, AMC, scheme category, transaction type and date range
+    (all filters optional and combined). AMC and category match partial names, e.g.
+    "HDFC" or "Large Cap". Amounts are negative for investments, positive for redemptions.
+
+    With aggregate=true returns count, amount and units sums and first/last date instead
+    of rows, optionally grouped by one of: isin, scheme, amc, scheme_category, type, year.
+    Otherwise returns the total count and up to `limit` (at most 200) matching rows in
+    date order.
+
+    Args:
+        isin (str): exact ISIN
+        amc (str): AMC name or part of it
+        scheme_category (str): scheme category or part of it, e.g. "ELSS"
+        transaction_type (str): e.g. PURCHASE, PURCHASE_SIP, REDEMPTION, SWITCH_IN,
+            DIVIDEND_PAYOUT
+        start_date (str): first date, YYYY-MM-DD
+        end_date (str): last date, YYYY-MM-DD
+        aggregate (bool): summarize instead of listing rows
+        group_by (str): column to group the summary by
+        limit (int): maximum number of rows to list
+    """
+    if group_by and group_by not in GROUP_BY_COLUMNS:
+        raise ValueError(f"group_by must be one of {', '.join(GROUP_BY_COLUMNS)}")
+
+    index = get_transaction_index(portfolio)
+    rows = index.rows(isin, amc, scheme_category, transaction_type, start_date, end_date)
+    if aggregate or group_by:
+        return _encode(f"{len(rows)} matching transactions", index.aggregate(rows, group_by))
+
+    limit = min(max(limit, 0), TRANSACTION_QUERY_MAX_ROWS)
+    matches = index.select(rows, RESULT_COLUMNS).sort_values("date", kind="stable").head(limit)
+    return _encode(
+        f"{len(rows)} matching transactions, the first {len(matches)} in date order", matches
+    )
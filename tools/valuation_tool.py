@@ -0,0 +1,35 @@
+import pandas as pd
+from langchain_core.tools import tool
+
+from domain.portfolio_valuation import total_value_history, value_history
+from tools.data_refs import Transactions
+
+AMOUNT_COLUMNS = ["units", "nav", "invested", "value", "gain"]
+
+
+@tool
+def get_portfolio_value_history(
+    transactions: Transactions, frequency: str = "monthly", isin: str | None = None
+) -> list:
+    """
+    Portfolio value, net invested amount and gain over time, for the whole portfolio or
+    one scheme.
+
+    Args:
+        transactions: var_transactions
+        frequency (str): "monthly" (month ends and today) or "daily"
+        isin (str, optional): only return the series of this scheme
+
+    Returns:
+        list: One dict per date with date, invested, value and gain (plus units and nav
+            for a single scheme); value is null where no NAV is known
+    """
+    history = value_history(pd.DataFrame(transactions), frequency)
+    if isin:
+        series = history.loc[history["isin"] == isin, ["date", *AMOUNT_COLUMNS]]
+    else:
+        series = total_value_history(history)
+
+    series = series.round({"units": 4, "nav": 4, "invested": 2, "value": 2, "gain": 2})
+    series = series.astype(object).where(series.notna(), None)
+    return series.to_dict("records")
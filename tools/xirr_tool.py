@@ -1,48 +1,55 @@
-from datetime import datetime
-
+import pandas as pd
 from langchain_core.tools import tool
-from scipy.optimize import newton
+
+from domain.rolling_xirr import rolling_xirr
+from domain.xirr import PORTFOLIO_ISIN, to_cashflow_arrays, xirr
+from tools.data_refs import Transactions, session_data
+
+Cashflows = session_data(
+    "transactions",
+    description='My transactions, or a list of cashflows with "amount" and "date"',
+    inline=True,
+)
 
 
 @tool
-def get_xirr(transactions: list[dict]) -> float:
+def get_xirr(transactions: Cashflows) -> float:
     """
-    Calculate the XIRR for a list of mutual fund transactions.
+    Calculate the XIRR for my transactions or a list of mutual fund cashflows.
 
     Each cashflow must have:
     - "amount": float (positive for inflows/redemptions, negative for investments)
     - "date": str in "YYYY-MM-DD" format
 
     Args:
-        transactions (list[dict]): List of dicts with "amount" and "date" keys
+        transactions: var_transactions, or a list of dicts with "amount" and "date" keys
 
     Returns:
         float: XIRR as a decimal (e.g., 0.124 means 12.4%)
     """
 
-    if not transactions or len(transactions) < 2:
+    if len(transactions) < 2:
         raise ValueError("At least two transactions are required to compute XIRR.")
 
-    # Convert to amounts and datetime objects
-    cash_flows = []
-    dates = []
-    for tx in transactions:
-        cash_flows.append(float(tx["amount"]))
-        dates.append(datetime.strptime(tx["date"], "%Y-%m-%d"))
-
-    # Use the earliest date as base
-    start_date = min(dates)
-
-    # XIRR objective function
-    def xnpv(rate: float):
-        return sum(
-            cf / (1 + rate) ** ((dt - start_date).days / 365) for cf, dt in zip(cash_flows, dates)
-        )
-
-    # Use Newton-Raphson method to solve for IRR
-    try:
-        result = newton(func=xnpv, x0=0.1)
-    except RuntimeError:
-        raise ValueError("XIRR calculation failed to converge.")
-
-    return float(result * 100)
+    amounts, day_offsets = to_cashflow_arrays(transactions)
+    return xirr(amounts, day_offsets) * 100
+
+
+@tool
+def get_xirr_history(transactions: Transactions, isin: str | None = None) -> list:
+    """
+    XIRR as of every month end (and today) for the whole portfolio or one scheme, with
+    the net invested amount and value on each date.
+
+    Args:
+        transactions: var_transactions
+        isin (str, optional): return the series of this scheme instead of the portfolio
+
+    Returns:
+        list: One dict per month end with date, invested, value and xirr (in %, null
+            where it is undefined)
+    """
+    series = rolling_xirr(pd.DataFrame(transactions))
+    series = series.loc[series["isin"] == (isin or PORTFOLIO_ISIN)]
+    series = series[["date", "invested", "value", "xirr"]].round(2)
+    return series.astype(object).where(series.notna(), None).to_dict("records")
@@ -1,13 +1,13 @@
-from typing import TypedDict
+from typing import Annotated, TypedDict
 
 from langchain_core.messages import AnyMessage
+from langgraph.graph.message import add_messages
 
 
 class CASAgentState(TypedDict):
-    messages: list[AnyMessage]
-    transactions: list[dict]
-    curr_holdings: list[dict]
-    past_holdings: list[dict]
+    messages: Annotated[list[AnyMessage], add_messages]
+    # PortfolioStore handle for the session's transactions, curr_holdings and past_holdings
+    portfolio: str
 
 
 class CASCodeAgentState(TypedDict):
@@ -1,3 +1,5 @@
+import json
+import time
 from uuid import uuid4
 
 import requests
@@ -9,6 +11,8 @@ class AgentClient:
     def __init__(self, base_url="http://localhost:8000/api"):
         self.upload_url = f"{base_url}/upload"
         self.chat_url = f"{base_url}/chat"
+        self.chat_stream_url = f"{base_url}/chat/stream"
+        self.jobs_url = f"{base_url}/jobs"
 
     def set_session_id(self, session_id):
         self.session_id = session_id
@@ -16,12 +20,27 @@ class AgentClient:
     def upload_file(self, file, password):
         files = {"file": (file.name, file, file.type)}
         data = {"password": password}
-        return requests.post(
+        response = requests.post(
             self.upload_url,
             files=files,
             data=data,
             headers={"session_id": self.session_id},
         )
+        response.raise_for_status()
+        return response.json()
+
+    def wait_for_job(self, job_id, poll_interval=0.5, timeout=300):
+        # both failures are RequestExceptions, which the upload handler reports as failed;
+        # a 404 means the job is unknown here (e.g. the poll reached another worker)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            response = requests.get(f"{self.jobs_url}/{job_id}", timeout=10)
+            response.raise_for_status()
+            job = response.json()
+            if job["status"] in ("done", "failed"):
+                return job
+            time.sleep(poll_interval)
+        raise requests.Timeout(f"Upload job {job_id} did not finish within {timeout}s")
 
     def send_message(self, message):
         response = requests.post(
@@ -31,6 +50,22 @@ class AgentClient:
         )
         return response.json().get("reply", "No response.")
 
+    def stream_message(self, message):
+        """Yield `(event, data)` pairs from the server-sent chat stream."""
+        with requests.post(
+            self.chat_stream_url,
+            json={"message": message},
+            headers={"session_id": self.session_id},
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line.removeprefix("event: ")
+                elif line.startswith("data: "):
+                    yield event, json.loads(line.removeprefix("data: "))
+
 
 # --- ChatBot: Manages UI and state ---
 class ChatBot:
@@ -60,15 +95,21 @@ class ChatBot:
                     st.warning("Please select a file before uploading.")
                     return
 
-                response = self.agent.upload_file(uploaded_file, password)
-                if response.status_code == 200:
+                with st.spinner("Parsing your CAS..."):
+                    try:
+                        job = self.agent.upload_file(uploaded_file, password)
+                        job = self.agent.wait_for_job(job["job_id"])
+                    except requests.RequestException:
+                        job = {"status": "failed"}
+
+                if job["status"] == "done":
                     st.success("✅ File uploaded and decrypted successfully.")
                     st.session_state.file_uploaded = True
                     st.session_state.chat_history.append(
                         ("system", f"You uploaded {uploaded_file.name}.")
                     )
                     st.session_state.chat_history.append(
-                        ("assistant", response.json().get("reply", ""))
+                        ("assistant", job["result"].get("reply", ""))
                     )
 
                 else:
@@ -83,9 +124,33 @@ class ChatBot:
 
         if user_input:
             st.session_state.chat_history.append(("user", user_input))
-            reply = self.agent.send_message(user_input)
+            with st.chat_message("user"):
+                st.markdown(user_input)
+            with st.chat_message("assistant"):
+                reply = self.stream_reply(user_input)
             st.session_state.chat_history.append(("assistant", reply))
 
+    def stream_reply(self, user_input):
+        status = st.empty()
+        answer = st.empty()
+        reply = ""
+        try:
+            for event, data in self.agent.stream_message(user_input):
+                if event == "tool_start":
+                    status.caption(f"⚙️ Running {data}...")
+                elif event == "tool_end":
+                    status.caption(f"✅ {data} finished")
+                elif event == "token":
+                    reply += data
+                    answer.markdown(reply + "▌")
+                elif event == "done":
+                    reply = data or reply
+        except requests.RequestException:
+            reply = reply or "No response."
+        status.empty()
+        answer.markdown(reply)
+        return reply
+
     def _handle_chat(self):
         # st.subheader("💬 Chat")
         user_input = st.chat_input("Ask something...")
@@ -111,8 +176,9 @@ def main():
     chatbot = ChatBot(agent)
 
     chatbot.handle_upload()
-    chatbot.handle_chat()
+    # history first: the new exchange is rendered below it while the reply streams in
     chatbot.render_history()
+    chatbot.handle_chat()
 
 
 if __name__ == "__main__":
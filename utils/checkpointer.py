@@ -0,0 +1,298 @@
+import sqlite3
+import threading
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from utils.db_utils import ThreadLocalSqlite
+from utils.serde import get_checkpoint_serde
+
+MESSAGES_CHANNEL = "messages"
+MESSAGE_RANGE_KEY = "__message_seq_range__"
+MESSAGE_IDS_KEY = "__message_ids__"
+
+CREATE_MESSAGES_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS checkpoint_messages (
+        thread_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        message_id TEXT NOT NULL,
+        type TEXT,
+        value BLOB,
+        PRIMARY KEY (thread_id, seq)
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS checkpoint_messages_id
+        ON checkpoint_messages (thread_id, message_id);
+"""
+MAX_SEQ_SQL = "SELECT MAX(seq) FROM checkpoint_messages WHERE thread_id = ?"
+SELECT_SEQS_SQL = "SELECT message_id, seq FROM checkpoint_messages WHERE thread_id = ?"
+INSERT_MESSAGE_SQL = "INSERT INTO checkpoint_messages (thread_id, seq, message_id, type, value) VALUES (?, ?, ?, ?, ?)"
+SELECT_RANGE_SQL = "SELECT message_id, type, value FROM checkpoint_messages WHERE thread_id = ? AND seq BETWEEN ? AND ? ORDER BY seq"
+SELECT_THREAD_MESSAGES_SQL = (
+    "SELECT message_id, type, value FROM checkpoint_messages WHERE thread_id = ?"
+)
+
+
+class _MessageStoreMixin:
+    """
+    Stores each chat message once instead of in every checkpoint.
+
+    SqliteSaver snapshots every channel value into every checkpoint row, so a growing
+    `messages` channel re-writes the whole conversation on each step. Here message
+    bodies go to `checkpoint_messages` the first time they are seen, numbered per thread
+    in arrival order, and the checkpoint row only keeps the (first, last) sequence range
+    of its messages - or their ids when they are not one contiguous run. Messages are
+    treated as immutable once they have an id.
+    """
+
+    @staticmethod
+    def _default_serde(kwargs: dict) -> dict:
+        return {**kwargs, "serde": kwargs.get("serde") or get_checkpoint_serde()}
+
+    def _init_message_store(self):
+        # thread_id -> {message_id: seq}
+        self._stored_seqs: dict[str, dict[str, int]] = {}
+
+    def _is_cache_fresh(self, thread_id: str, max_seq: int | None) -> bool:
+        # stale when another saver (e.g. the other graph) wrote to this thread
+        cached = self._stored_seqs.get(thread_id)
+        return cached is not None and max(cached.values(), default=None) == max_seq
+
+    def _new_message_rows(self, thread_id: str, messages: list[BaseMessage]) -> list[tuple]:
+        seqs = self._stored_seqs[thread_id]
+        next_seq = max(seqs.values(), default=-1) + 1
+        rows = []
+        for msg in messages:
+            if msg.id not in seqs:
+                seqs[msg.id] = next_seq
+                rows.append((thread_id, next_seq, msg.id, *self.serde.dumps_typed(msg)))
+                next_seq += 1
+        return rows
+
+    def _message_refs(self, thread_id: str, messages: list[BaseMessage]) -> dict:
+        seqs = [self._stored_seqs[thread_id][msg.id] for msg in messages]
+        if seqs and seqs == list(range(seqs[0], seqs[0] + len(seqs))):
+            return {MESSAGE_RANGE_KEY: [seqs[0], seqs[-1]]}
+        return {MESSAGE_IDS_KEY: [msg.id for msg in messages]}
+
+    @staticmethod
+    def _messages_to_store(checkpoint: Checkpoint) -> list[BaseMessage] | None:
+        messages = checkpoint["channel_values"].get(MESSAGES_CHANNEL)
+        if isinstance(messages, list) and all(getattr(msg, "id", None) for msg in messages):
+            return messages
+        return None
+
+    @staticmethod
+    def _with_message_refs(checkpoint: Checkpoint, refs: dict) -> Checkpoint:
+        return {
+            **checkpoint,
+            "channel_values": {**checkpoint["channel_values"], MESSAGES_CHANNEL: refs},
+        }
+
+    @staticmethod
+    def _message_refs_of(checkpoint_tuple: CheckpointTuple) -> dict | None:
+        refs = checkpoint_tuple.checkpoint["channel_values"].get(MESSAGES_CHANNEL)
+        if isinstance(refs, dict) and refs.keys() & {MESSAGE_RANGE_KEY, MESSAGE_IDS_KEY}:
+            return refs
+        return None
+
+    @staticmethod
+    def _select_messages_query(thread_id: str, refs: dict) -> tuple[str, tuple]:
+        if MESSAGE_RANGE_KEY in refs:
+            return SELECT_RANGE_SQL, (thread_id, *refs[MESSAGE_RANGE_KEY])
+        return SELECT_THREAD_MESSAGES_SQL, (thread_id,)
+
+    def _restore_messages(self, checkpoint_tuple: CheckpointTuple, refs: dict, rows):
+        by_id = {message_id: (type_, value) for message_id, type_, value in rows}
+        message_ids = refs[MESSAGE_IDS_KEY] if MESSAGE_IDS_KEY in refs else list(by_id)
+        checkpoint_tuple.checkpoint["channel_values"][MESSAGES_CHANNEL] = [
+            self.serde.loads_typed(by_id[message_id]) for message_id in message_ids
+        ]
+        return checkpoint_tuple
+
+
+class MessageStoreSqliteSaver(_MessageStoreMixin, SqliteSaver):
+    """
+    SqliteSaver that keeps chat messages out of the checkpoint rows.
+
+    Accepts either a connection or a `ThreadLocalSqlite`. With the latter each thread
+    works on its own connection and cursors are not serialized by the saver's lock
+    (sync agents only; the API uses the async saver on one connection).
+    """
+
+    def __init__(self, conn: sqlite3.Connection | ThreadLocalSqlite, *args, **kwargs):
+        self._setup_lock = threading.Lock()
+        super().__init__(conn, *args, **self._default_serde(kwargs))
+        self._init_message_store()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if isinstance(self._connections, ThreadLocalSqlite):
+            return self._connections.get()
+        return self._connections
+
+    @conn.setter
+    def conn(self, conn: sqlite3.Connection | ThreadLocalSqlite):
+        self._connections = conn
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        if not isinstance(self._connections, ThreadLocalSqlite):
+            with super().cursor(transaction) as cur:
+                yield cur
+            return
+
+        self.setup()
+        conn = self.conn
+        cur = conn.cursor()
+        try:
+            yield cur
+        finally:
+            if transaction:
+                conn.commit()
+            cur.close()
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        with self._setup_lock:
+            if self.is_setup:
+                return
+            super().setup()
+            self.conn.executescript(CREATE_MESSAGES_TABLE_SQL)
+            self.conn.commit()
+
+    def _store_messages(self, thread_id: str, messages: list[BaseMessage]):
+        with self.cursor() as cur:
+            cur.execute(MAX_SEQ_SQL, (thread_id,))
+            if not self._is_cache_fresh(thread_id, cur.fetchone()[0]):
+                cur.execute(SELECT_SEQS_SQL, (thread_id,))
+                self._stored_seqs[thread_id] = dict(cur.fetchall())
+            cur.executemany(INSERT_MESSAGE_SQL, self._new_message_rows(thread_id, messages))
+
+    def _load_messages(self, checkpoint_tuple: CheckpointTuple) -> CheckpointTuple:
+        if (refs := self._message_refs_of(checkpoint_tuple)) is None:
+            return checkpoint_tuple
+        thread_id = checkpoint_tuple.config["configurable"]["thread_id"]
+        with self.cursor(transaction=False) as cur:
+            cur.execute(*self._select_messages_query(thread_id, refs))
+            return self._restore_messages(checkpoint_tuple, refs, cur.fetchall())
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        if (messages := self._messages_to_store(checkpoint)) is not None:
+            thread_id = str(config["configurable"]["thread_id"])
+            self._store_messages(thread_id, messages)
+            checkpoint = self._with_message_refs(
+                checkpoint, self._message_refs(thread_id, messages)
+            )
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        if checkpoint_tuple := super().get_tuple(config):
+            return self._load_messages(checkpoint_tuple)
+        return None
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        # materialized first: SqliteSaver.list holds the (non-reentrant) lock while iterating
+        checkpoint_tuples = [*super().list(config, filter=filter, before=before, limit=limit)]
+        for checkpoint_tuple in checkpoint_tuples:
+            yield self._load_messages(checkpoint_tuple)
+
+
+class AsyncMessageStoreSqliteSaver(_MessageStoreMixin, AsyncSqliteSaver):
+    """AsyncSqliteSaver that keeps chat messages out of the checkpoint rows."""
+
+    def __init__(self, conn, *args, **kwargs):
+        super().__init__(conn, *args, **self._default_serde(kwargs))
+        self._init_message_store()
+
+    async def setup(self) -> None:
+        if self.is_setup:
+            return
+        await super().setup()
+        async with self.lock:
+            await self.conn.executescript(CREATE_MESSAGES_TABLE_SQL)
+            await self.conn.commit()
+
+    async def _store_messages(self, thread_id: str, messages: list[BaseMessage]):
+        async with self.lock:
+            async with self.conn.execute(MAX_SEQ_SQL, (thread_id,)) as cur:
+                (max_seq,) = await cur.fetchone()
+            if not self._is_cache_fresh(thread_id, max_seq):
+                async with self.conn.execute(SELECT_SEQS_SQL, (thread_id,)) as cur:
+                    self._stored_seqs[thread_id] = dict(await cur.fetchall())
+            await self.conn.executemany(
+                INSERT_MESSAGE_SQL, self._new_message_rows(thread_id, messages)
+            )
+            await self.conn.commit()
+
+    async def _load_messages(self, checkpoint_tuple: CheckpointTuple) -> CheckpointTuple:
+        if (refs := self._message_refs_of(checkpoint_tuple)) is None:
+            return checkpoint_tuple
+        thread_id = checkpoint_tuple.config["configurable"]["thread_id"]
+        async with self.lock:
+            async with self.conn.execute(*self._select_messages_query(thread_id, refs)) as cur:
+                rows = await cur.fetchall()
+        return self._restore_messages(checkpoint_tuple, refs, rows)
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        await self.setup()
+        if (messages := self._messages_to_store(checkpoint)) is not None:
+            thread_id = str(config["configurable"]["thread_id"])
+            await self._store_messages(thread_id, messages)
+            checkpoint = self._with_message_refs(
+                checkpoint, self._message_refs(thread_id, messages)
+            )
+        return await super().aput(config, checkpoint, metadata, new_versions)
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        if checkpoint_tuple := await super().aget_tuple(config):
+            return await self._load_messages(checkpoint_tuple)
+        return None
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        # materialized first: AsyncSqliteSaver.alist holds the lock while iterating
+        checkpoint_tuples = [
+            checkpoint_tuple
+            async for checkpoint_tuple in super().alist(
+                config, filter=filter, before=before, limit=limit
+            )
+        ]
+        for checkpoint_tuple in checkpoint_tuples:
+            yield await self._load_messages(checkpoint_tuple)
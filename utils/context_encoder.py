@@ -0,0 +1,93 @@
+import json
+import logging
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from config.constants import CONTEXT_FLOAT_DIGITS, TOKENIZER_ENCODING
+
+logger = logging.getLogger(__name__)
+
+# rough chars-per-token ratio used when the tokenizer files are unavailable
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception:
+        logger.warning("Tokenizer %s unavailable, estimating token counts", TOKENIZER_ENCODING)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if (encoding := _get_encoding()) is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages) -> int:
+    return sum(count_tokens(str(msg.content)) for msg in messages)
+
+
+def _format_cell(value) -> str:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    if isinstance(value, float | np.floating):
+        return f"{value:.{CONTEXT_FLOAT_DIGITS}f}".rstrip("0").rstrip(".")
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def encode_table(data, token_budget: int | None = None) -> str:
+    """
+    Encode tabular data as a header line plus one `|`-separated line per row.
+
+    Floats are rounded and there is no per-row key repetition, which is several times
+    smaller than indented JSON records. When `token_budget` is given, trailing rows that
+    do not fit are replaced by one line with their count and numeric column totals.
+    """
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    header = "|".join(map(str, df.columns))
+    lines = ["|".join(map(_format_cell, row)) for row in df.itertuples(index=False)]
+
+    if token_budget is None:
+        return "\n".join([header, *lines])
+
+    # per-line counts (+1 for the newline) so the cut point is one searchsorted
+    used = np.cumsum([count_tokens(line) + 1 for line in [header, *lines]])
+    kept = int(np.searchsorted(used, token_budget, side="right")) - 1
+    if kept >= len(lines):
+        return "\n".join([header, *lines])
+
+    # make room for the truncation note
+    kept = max(kept - 2, 0)
+    dropped = df.iloc[kept:]
+    totals = dropped.select_dtypes("number").sum()
+    note = f"... {len(dropped)} more rows omitted"
+    if not totals.empty:
+        sums = ", ".join(f"{col}={_format_cell(float(val))}" for col, val in totals.items())
+        note += f" (totals: {sums})"
+    return "\n".join([header, *lines[:kept], note])
+
+
+def _is_records(obj) -> bool:
+    return isinstance(obj, list) and bool(obj) and all(isinstance(item, dict) for item in obj)
+
+
+def encode_value(obj, token_budget: int | None = None) -> str:
+    """
+    Compact encoding for tool results: tables for record lists, minified JSON otherwise.
+
+    Strings are passed through as-is, for tools that encode their own results.
+    """
+    if isinstance(obj, str):
+        return obj
+    if isinstance(obj, pd.DataFrame) or _is_records(obj):
+        return encode_table(obj, token_budget)
+    if isinstance(obj, float):
+        return _format_cell(obj)
+    return json.dumps(obj, separators=(",", ":"), default=str)
@@ -1,8 +1,73 @@
 # utils/db_utils.py
 import sqlite3
+import threading
+from contextlib import asynccontextmanager
+from functools import cache
 
-from config.constants import SQLITE_DB_PATH
+import aiosqlite
 
+from config.constants import SQLITE_BUSY_TIMEOUT_MS, SQLITE_DB_PATH
 
-def get_sqlite_connection():
-    return sqlite3.connect(SQLITE_DB_PATH, check_same_thread=False)
+# WAL lets readers run alongside the single writer; NORMAL sync is durable under WAL
+# except for the last transactions on power loss, which is fine for chat checkpoints.
+# auto_vacuum only takes effect on a new database (see services/checkpoint_retention.py)
+SQLITE_PRAGMAS = (
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous=NORMAL",
+)
+
+
+def connect_sqlite(path: str = SQLITE_DB_PATH) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ThreadLocalSqlite:
+    """
+    Hands out one configured connection per thread for a database file.
+
+    Used by the synchronous agents (CLI and scripts), whose graphs may run on several
+    threads, so they don't share one connection behind the saver's lock. It is not a
+    throughput optimization: graph execution under the GIL dominates and the benchmark
+    shows no gain over a shared connection. The API serves through the async saver on
+    the single aiosqlite connection from `get_async_sqlite_connection`.
+    """
+
+    def __init__(self, path: str = SQLITE_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[sqlite3.Connection] = []
+
+    def get(self) -> sqlite3.Connection:
+        if (conn := getattr(self._local, "conn", None)) is None:
+            conn = self._local.conn = connect_sqlite(self.path)
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+@cache
+def get_thread_local_sqlite(path: str = SQLITE_DB_PATH) -> ThreadLocalSqlite:
+    return ThreadLocalSqlite(path)
+
+
+@asynccontextmanager
+async def get_async_sqlite_connection():
+    async with aiosqlite.connect(
+        SQLITE_DB_PATH, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000
+    ) as conn:
+        for pragma in SQLITE_PRAGMAS:
+            await conn.execute(pragma)
+        yield conn
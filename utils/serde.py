@@ -0,0 +1,134 @@
+import threading
+import time
+import zlib
+from functools import cache
+from typing import Any
+
+from config.constants import CHECKPOINT_COMPRESSION_MIN_BYTES
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib from the stdlib is used instead
+    zstandard = None
+
+
+class _ZlibCodec:
+    name = "zlib"
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, 3)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class _ZstdCodec:
+    name = "zstd"
+
+    def __init__(self):
+        # zstandard (de)compressors are not thread-safe; keep one pair per thread
+        self._local = threading.local()
+
+    def _pair(self):
+        if not hasattr(self._local, "compressor"):
+            self._local.compressor = zstandard.ZstdCompressor(level=3)
+            self._local.decompressor = zstandard.ZstdDecompressor()
+        return self._local.compressor, self._local.decompressor
+
+    def compress(self, data: bytes) -> bytes:
+        return self._pair()[0].compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._pair()[1].decompress(data)
+
+
+def _available_codecs() -> dict:
+    codecs = {"zlib": _ZlibCodec()}
+    if zstandard is not None:
+        codecs["zstd"] = _ZstdCodec()
+    return codecs
+
+
+class CompressedSerializer:
+    """
+    Wraps a checkpoint serializer and compresses its payloads.
+
+    The codec is appended to the stored type ("msgpack+zstd"), so rows written before
+    compression (plain "msgpack") or with another codec still load. Payloads smaller
+    than `min_bytes` are stored as-is. Sizes and (de)serialization times are counted
+    for `stats`.
+    """
+
+    def __init__(
+        self,
+        inner=None,
+        codec: str | None = None,
+        min_bytes: int = CHECKPOINT_COMPRESSION_MIN_BYTES,
+    ):
+        if inner is None:
+            # imported here to keep this module cheap to import at API startup
+            from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+            inner = JsonPlusSerializer()
+        self.inner = inner
+        self.codecs = _available_codecs()
+        self.codec = self.codecs[codec or ("zstd" if "zstd" in self.codecs else "zlib")]
+        self.min_bytes = min_bytes
+        self._lock = threading.Lock()
+        self._stats = {
+            "dumps": 0,
+            "loads": 0,
+            "raw_bytes": 0,
+            "stored_bytes": 0,
+            "dumps_seconds": 0.0,
+            "loads_seconds": 0.0,
+        }
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.inner.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(data)
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        started = time.perf_counter()
+        type_, data = self.inner.dumps_typed(obj)
+        stored_type, stored = type_, data
+        if len(data) >= self.min_bytes:
+            stored_type, stored = f"{type_}+{self.codec.name}", self.codec.compress(data)
+        self._count(
+            dumps=1,
+            raw_bytes=len(data),
+            stored_bytes=len(stored),
+            dumps_seconds=time.perf_counter() - started,
+        )
+        return stored_type, stored
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        started = time.perf_counter()
+        type_, payload = data
+        base_type, _, codec = type_.partition("+")
+        if codec in self.codecs:
+            type_, payload = base_type, self.codecs[codec].decompress(payload)
+        obj = self.inner.loads_typed((type_, payload))
+        self._count(loads=1, loads_seconds=time.perf_counter() - started)
+        return obj
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["codec"] = self.codec.name
+        stats["compression_ratio"] = (
+            round(stats["raw_bytes"] / stats["stored_bytes"], 2) if stats["stored_bytes"] else None
+        )
+        return stats
+
+
+@cache
+def get_checkpoint_serde() -> CompressedSerializer:
+    return CompressedSerializer()
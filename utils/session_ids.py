@@ -0,0 +1,22 @@
+import re
+
+# session ids name directories and files on disk, so only plain names are allowed
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,128}")
+
+
+class PortfolioNotUploadedError(LookupError):
+    """
+    The session has no stored portfolio: nothing was uploaded yet, or its checkpoint
+    predates the portfolio store and still holds the parsed lists instead of a handle.
+    """
+
+    def __init__(self, session_id: str):
+        super().__init__("No portfolio for this session; please upload your CAS first.")
+        self.session_id = session_id
+
+
+def validate_session_id(session_id) -> str:
+    """Return `session_id` if it is a safe directory name, else raise ValueError."""
+    if not isinstance(session_id, str) or not SESSION_ID_PATTERN.fullmatch(session_id):
+        raise ValueError(f"Invalid session id: {session_id!r}")
+    return session_id
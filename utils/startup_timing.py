@@ -0,0 +1,28 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_timings: dict[str, float] = {}
+_lock = threading.Lock()
+
+
+@contextmanager
+def timed(component: str):
+    """Record how long the block takes (import or init of a component) for the startup report."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with _lock:
+            _timings[component] = round(elapsed_ms, 1)
+        logger.info("%s: %.1f ms", component, elapsed_ms)
+
+
+def startup_report() -> dict[str, float]:
+    """Milliseconds per recorded component, in the order they were first measured."""
+    with _lock:
+        return dict(_timings)